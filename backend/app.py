@@ -3,17 +3,38 @@ FastAPI Application - AI SDR Chatbot
 Main entry point with API routes.
 """
 
-from fastapi import FastAPI, Body, APIRouter, HTTPException
+from fastapi import FastAPI, Body, APIRouter, HTTPException, Depends, Header, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Optional
+import asyncio
+import json
+import secrets
+import threading
+import time
 import uvicorn
 
+from config import get_settings
 from models.schemas import (
+    BatchChatRequest,
     ChatRequest,
     ChatResponse,
     InitChatRequest,
-    InitChatResponse
+    InitChatResponse,
+    Message
 )
 from services.chat_service import get_chat_service
+from services.tenants import UnknownTenantError, get_tenant_chat_service, get_tenant_registry
+from services.conversation_state import ConversationState
+from services.admission import get_session_throttle
+from services.batch_service import get_batch_service
+from services.persistence_service import get_persistence_service
+from services.export_service import EXPORT_TABLES, iter_export, parse_cursor
+from services.tracing import get_tracer
+from services.profiling import maybe_profile
 
 app = FastAPI(title="EliseAI SDR Chatbot API")
 
@@ -26,9 +47,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+if get_settings().tracing_enabled:
+    @app.middleware("http")
+    async def trace_requests(request: Request, call_next):
+        """Open the root span for each request; endpoint and service spans nest under it."""
+        with get_tracer().span("http.request", method=request.method, path=request.url.path) as span:
+            response = await call_next(request)
+            span.set_attribute("status_code", response.status_code)
+            return response
+
 api_router = APIRouter(prefix="/api")
 
 
+def resolve_chat_service(tenant_id: Optional[str]):
+    """Chat service for the requested tenant (404 if it is not configured)."""
+    try:
+        return get_tenant_chat_service(tenant_id)
+    except UnknownTenantError:
+        raise HTTPException(status_code=404, detail=f"Unknown tenant '{tenant_id}'")
+
+
+def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Reject requests without the configured admin key."""
+    admin_key = get_settings().admin_api_key
+    if not admin_key:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, admin_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+
 @api_router.get("/")
 def root():
     """Health check endpoint."""
@@ -39,19 +87,62 @@ def root():
     }
 
 
+@api_router.get("/metrics", dependencies=[Depends(require_admin)])
+def metrics():
+    """Service counters (request coalescing, per-tenant residency, etc.)."""
+    chat_service = get_chat_service()
+    stats = chat_service.get_stats()
+    stats["session_throttle"] = get_session_throttle().get_stats()
+    if get_settings().persistence_enabled:
+        stats["persistence"] = get_persistence_service().get_stats()
+    stats["tracing"] = get_tracer().get_stats()
+    stats["tenants"] = get_tenant_registry().get_stats()
+    return stats
+
+
+@api_router.get("/admin/index", dependencies=[Depends(require_admin)])
+def index_status(tenant_id: Optional[str] = None):
+    """Active knowledge base build (version, build time) and reload watcher state."""
+    return resolve_chat_service(tenant_id).rag_service.get_index_status()
+
+
+@api_router.post("/admin/index/reload", dependencies=[Depends(require_admin)])
+def reload_index(tenant_id: Optional[str] = None):
+    """Check for a new knowledge base build now instead of waiting for the watcher."""
+    rag_service = resolve_chat_service(tenant_id).rag_service
+    try:
+        reloaded = rag_service.reload_index()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading index: {str(e)}")
+    return {"reloaded": reloaded, **rag_service.get_index_status()}
+
+
 @api_router.post("/chat/init", response_model=InitChatResponse)
-def init_chat(request: InitChatRequest):
+def init_chat(
+    request: InitChatRequest,
+    response: Response,
+    x_profile_token: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None)
+):
     """
     Initialize a new chat session with an initial greeting.
     
     Args:
         request: Init chat request with session_id
+        x_profile_token: Admin key to profile this request (when profiling is enabled)
+        x_tenant_id: Tenant to chat with, if not given in the body
     
     Returns:
         Initial greeting and setup info
     """
+    with maybe_profile("chat_init", x_profile_token, response):
+        return handle_init_chat(request, request.tenant_id or x_tenant_id)
+
+
+def handle_init_chat(request: InitChatRequest, tenant_id: Optional[str] = None) -> InitChatResponse:
+    """Build the greeting for /chat/init."""
+    chat_service = resolve_chat_service(tenant_id)
     try:
-        chat_service = get_chat_service()
         greeting = chat_service.get_initial_greeting()
         
         return InitChatResponse(
@@ -64,7 +155,12 @@ def init_chat(request: InitChatRequest):
 
 
 @api_router.post("/chat", response_model=ChatResponse)
-def chat(request: ChatRequest):
+def chat(
+    request: ChatRequest,
+    response: Response,
+    x_profile_token: Optional[str] = Header(None),
+    x_tenant_id: Optional[str] = Header(None)
+):
     """
     Main chat endpoint - handles conversation with the AI SDR.
     
@@ -73,25 +169,339 @@ def chat(request: ChatRequest):
     
     Args:
         request: Chat request with messages and session_id
+        x_profile_token: Admin key to profile this request (when profiling is enabled)
+        x_tenant_id: Tenant to chat with, if not given in the body
     
     Returns:
         AI response with optional quick replies and sources
     """
+    with maybe_profile("chat", x_profile_token, response):
+        return handle_chat(request, request.tenant_id or x_tenant_id)
+
+
+def handle_chat(request: ChatRequest, tenant_id: Optional[str] = None) -> ChatResponse:
+    """Run one chat turn for /chat."""
+    tracer = get_tracer()
+    tracer.set_session(request.session_id)
+    root_span = tracer.current_span()
+    if root_span is not None:
+        # Body read and validation happened between the root span starting and now
+        tracer.record("request.parse", root_span.start_ns, messages=len(request.messages))
+    
+    if request.session_id and not get_session_throttle().allow(request.session_id):
+        raise HTTPException(status_code=429, detail="Too many messages - please slow down")
+    
+    chat_service = resolve_chat_service(tenant_id)
     try:
-        chat_service = get_chat_service()
-        result = chat_service.handle_message(request.messages)
+        started = time.monotonic()
+        result = chat_service.handle_message(request.messages, session_id=request.session_id)
         
-        return ChatResponse(
-            response=result["response"],
-            quick_replies=result.get("quick_replies"),
-            sources=result.get("sources"),
-            tool_used=result.get("tool_used"),
-            calendly_url=result.get("calendly_url")
-        )
+        if get_settings().persistence_enabled:
+            record_chat_turn(request.session_id, request.messages, result, (time.monotonic() - started) * 1000)
+        
+        with tracer.span("response.serialize"):
+            return build_chat_response(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
 
+def build_chat_response(result: dict) -> ChatResponse:
+    """Convert a ChatService result into the public response model."""
+    return ChatResponse(
+        response=result["response"],
+        quick_replies=result.get("quick_replies"),
+        sources=result.get("sources"),
+        tool_used=result.get("tool_used"),
+        calendly_url=result.get("calendly_url"),
+        degraded=result.get("degraded", False)
+    )
+
+
+def record_chat_turn(session_id: Optional[str], messages: list[Message], result: dict, latency_ms: float):
+    """Queue the turn (and any demo booking) for write-behind persistence."""
+    persistence = get_persistence_service()
+    last_message = messages[-1] if messages else None
+    user_message = last_message.content if last_message and last_message.role == "user" else None
+    
+    persistence.record_turn(
+        session_id=session_id,
+        user_message=user_message,
+        assistant_response=result["response"],
+        tool_used=result.get("tool_used"),
+        latency_ms=latency_ms,
+        usage=result.get("usage"),
+        degraded=result.get("degraded", False)
+    )
+    
+    if result.get("tool_used") == "book_demo":
+        tool_args = result.get("tool_args") or {}
+        persistence.record_demo_booking(
+            session_id=session_id,
+            reason=tool_args.get("reason"),
+            calendly_url=result.get("calendly_url")
+        )
+
+
+@api_router.websocket("/chat/ws")
+async def chat_ws(websocket: WebSocket, session_id: Optional[str] = None, tenant_id: Optional[str] = None):
+    """
+    Persistent chat connection - one per session.
+    
+    History and conversation state live on the connection, so each turn sends
+    only the new message. Idle connections hold no worker thread; a thread is
+    used only while a reply is being generated.
+    
+    Client messages:
+        {"type": "message", "content": "..."}  - a user turn
+        {"type": "pong"}                        - heartbeat reply
+    
+    Server messages:
+        {"type": "greeting", "session_id", "response", "quick_replies"} - on connect
+        {"type": "token", "content"}     - reply text as it is generated
+        {"type": "done", ...}            - final reply with sources and quick replies (ChatResponse fields)
+        {"type": "error", "detail"}      - the turn was rejected or failed
+        {"type": "ping"}                 - heartbeat; the client should answer with a pong
+    
+    Args:
+        websocket: The connection
+        session_id: Session identifier (generated if omitted)
+        tenant_id: Tenant to chat with (default tenant if omitted)
+    """
+    settings = get_settings()
+    await websocket.accept()
+    
+    try:
+        # Loading a tenant's index can take a while - keep it off the event loop
+        chat_service = await run_in_threadpool(get_tenant_chat_service, tenant_id)
+    except UnknownTenantError:
+        await websocket.close(code=1008, reason=f"Unknown tenant '{tenant_id}'")
+        return
+    
+    session_id = session_id or secrets.token_hex(16)
+    greeting = chat_service.get_initial_greeting()
+    history = [Message(role="assistant", content=greeting["response"])]
+    state = ConversationState(chat_service.tenant.product_names)
+    
+    try:
+        await websocket.send_json({
+            "type": "greeting",
+            "session_id": session_id,
+            "response": greeting["response"],
+            "quick_replies": greeting.get("quick_replies")
+        })
+        
+        last_seen = time.monotonic()
+        while True:
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), timeout=settings.ws_heartbeat_interval)
+            except asyncio.TimeoutError:
+                if time.monotonic() - last_seen > settings.ws_heartbeat_timeout:
+                    await websocket.close(code=1001, reason="Heartbeat timeout")
+                    return
+                await websocket.send_json({"type": "ping"})
+                continue
+            
+            last_seen = time.monotonic()
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Invalid JSON"})
+                continue
+            
+            if not isinstance(event, dict) or event.get("type") != "message":
+                continue
+            
+            content = event.get("content")
+            if not isinstance(content, str) or not content.strip():
+                await websocket.send_json({"type": "error", "detail": "Message content is required"})
+                continue
+            if not get_session_throttle().allow(session_id):
+                await websocket.send_json({"type": "error", "detail": "Too many messages - please slow down"})
+                continue
+            
+            history.append(Message(role="user", content=content))
+            try:
+                result = await stream_chat_turn(websocket, chat_service, session_id, history, state)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                # Drop the unanswered message; the state resyncs on the next turn
+                history.pop()
+                await websocket.send_json({"type": "error", "detail": f"Error processing message: {str(e)}"})
+                continue
+            
+            history.append(Message(role="assistant", content=result["response"]))
+            await websocket.send_json({"type": "done", **build_chat_response(result).model_dump()})
+    except WebSocketDisconnect:
+        return
+
+
+async def stream_chat_turn(
+    websocket: WebSocket,
+    chat_service,
+    session_id: str,
+    history: list[Message],
+    state: ConversationState
+) -> dict:
+    """
+    Run one turn in a worker thread, forwarding tokens to the client as they arrive.
+    
+    Tokens pass through a bounded queue: when the client reads slower than the
+    model writes, the worker blocks on the full queue instead of buffering
+    the reply in memory. The worker holds an upstream admission slot while
+    streaming, so a client that stops reading for ws_send_timeout seconds is
+    treated as gone and the turn is cancelled, releasing the slot.
+    
+    Raises:
+        WebSocketDisconnect: If the client went away or stopped reading during the turn
+    """
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    outbox = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+    disconnected = threading.Event()
+    
+    def on_token(delta: str):
+        # Raising aborts the upstream stream, so the turn stops holding its slot
+        if disconnected.is_set():
+            raise WebSocketDisconnect()
+        future = asyncio.run_coroutine_threadsafe(outbox.put({"type": "token", "content": delta}), loop)
+        try:
+            future.result(timeout=settings.ws_send_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            disconnected.set()
+            raise WebSocketDisconnect()
+    
+    async def send_tokens():
+        while (event := await outbox.get()) is not None:
+            if disconnected.is_set():
+                # Keep draining so the worker never blocks on a dead connection
+                continue
+            try:
+                await asyncio.wait_for(websocket.send_json(event), timeout=settings.ws_send_timeout)
+            except Exception:
+                disconnected.set()
+    
+    def run_turn() -> dict:
+        tracer = get_tracer()
+        with tracer.span("ws.turn", messages=len(history)):
+            tracer.set_session(session_id)
+            started = time.monotonic()
+            result = chat_service.handle_message(
+                list(history),
+                session_id=session_id,
+                state=state,
+                on_token=on_token
+            )
+            if settings.persistence_enabled:
+                record_chat_turn(session_id, history, result, (time.monotonic() - started) * 1000)
+            return result
+    
+    sender = asyncio.create_task(send_tokens())
+    try:
+        result = await run_in_threadpool(run_turn)
+    finally:
+        await outbox.put(None)
+        await sender
+    
+    if disconnected.is_set():
+        raise WebSocketDisconnect()
+    return result
+
+
+@api_router.post("/chat/batch", dependencies=[Depends(require_admin)])
+def chat_batch(request: BatchChatRequest):
+    """
+    Run many independent conversations for offline evaluation or bulk replay.
+    
+    Admin-only: each conversation is a paid OpenAI turn sharing upstream
+    slots with live chat.
+    
+    Results are streamed back as newline-delimited JSON in completion order,
+    followed by a summary line with aggregate latency and token statistics.
+    
+    Args:
+        request: Batch request with conversations and optional parallelism
+    
+    Returns:
+        NDJSON stream of result/error items and a final summary
+    """
+    settings = get_settings()
+    if len(request.conversations) > settings.batch_max_conversations:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {settings.batch_max_conversations} conversations"
+        )
+    
+    batch_service = get_batch_service(get_chat_service())
+    items = batch_service.run(request.conversations, request.parallelism)
+    
+    return StreamingResponse(
+        (json.dumps(item) + "\n" for item in items),
+        media_type="application/x-ndjson"
+    )
+
+
+@api_router.get("/export/{export}", dependencies=[Depends(require_admin)])
+def export_conversations(
+    export: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session_id: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="'<created_at>:<id>' of the last row already received"),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """
+    Stream persisted conversations as newline-delimited JSON.
+    
+    Rows are read in fixed-size batches ordered by (created_at, id), so the
+    export runs in constant memory. To resume, pass the created_at and id of
+    the last row received as the cursor.
+    
+    Args:
+        export: 'turns' or 'demo_bookings'
+        since: Only rows at or after this time
+        until: Only rows before this time
+        session_id: Only rows for this session
+        cursor: Resume after this row
+        limit: Maximum rows to return
+    
+    Returns:
+        NDJSON stream, one row per line
+    """
+    if export not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{export}'")
+    
+    try:
+        after = parse_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    settings = get_settings()
+    rows = iter_export(
+        settings.database_url,
+        export,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        session_id=session_id,
+        after=after,
+        limit=limit,
+        batch_size=settings.export_batch_size
+    )
+    
+    return StreamingResponse(
+        (json.dumps(row) + "\n" for row in rows),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.on_event("shutdown")
+def flush_persistence():
+    """Write any queued conversation rows before the process exits."""
+    if get_settings().persistence_enabled:
+        get_persistence_service().close()
+
+
 app.include_router(api_router)
 
 
@@ -5,6 +5,7 @@ Loads settings from environment variables with sensible defaults.
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 import os
 
 
@@ -14,6 +15,20 @@ class Settings(BaseSettings):
     # API Keys
     openai_api_key: str
     
+    # Tracing (spans exported as JSON lines)
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 0.1
+    tracing_export_path: str = "/data/traces.jsonl"
+    tracing_queue_size: int = 10000
+    
+    # On-demand profiling (requests send X-Profile-Token equal to admin_api_key)
+    profiling_enabled: bool = False
+    profiling_output_dir: str = "/data/profiles"
+    profiling_sample_interval: float = 0.005
+    
+    # Admin endpoints (export, index status) are disabled unless a key is set
+    admin_api_key: Optional[str] = None
+    
     # Database paths
     database_url: str = "/data/practical.db"
     chroma_persist_directory: str = "/app/data/chroma_db"
@@ -27,12 +42,97 @@ class Settings(BaseSettings):
     chunk_size: int = 1000
     chunk_overlap: int = 200
     embedding_model: str = "text-embedding-3-small"
+    embedding_dimensions: Optional[int] = None  # Shortened embeddings; must match the built index
     rag_top_k: int = 3
     
+    # Two-stage retrieval: pick top articles by summary, then search only their chunks
+    rag_hierarchical: bool = False
+    rag_article_top_k: int = 5
+    
+    # Synthetic questions: ingest embeds likely questions per chunk as pointers to it,
+    # and retrieval matches queries against both (question_generator: openai, heuristic or module:Class)
+    question_generator: Optional[str] = None
+    question_generation_model: str = "gpt-4o-mini"
+    questions_per_chunk: int = 3
+    rag_use_questions: bool = False
+    
+    # Ingest-time near-duplicate collapsing (MinHash/LSH over word shingles)
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.8  # Shingle Jaccard similarity at which chunks are merged
+    dedup_num_perm: int = 128
+    dedup_shingle_size: int = 5
+    
+    # Versioned index builds: the API polls the manifest and swaps in new builds (0 disables)
+    index_reload_interval: float = 30.0
+    index_keep_versions: int = 3
+    
+    # Quantized embedding index (see scripts/export_quantized_index.py).
+    # Versioned builds record their own; this path is only used without a manifest.
+    quantized_index_path: Optional[str] = None
+    quantized_rescore: bool = True
+    quantized_rescore_factor: int = 4
+    
     # LLM settings
     llm_model: str = "gpt-4o-mini"
     llm_temperature: float = 0.7
     max_tokens: int = 800
+    llm_short_circuit_terminal_tools: bool = True  # Render book_demo replies without a second completion
+    llm_cost_per_1k_input: float = 0.00015
+    llm_cost_per_1k_output: float = 0.0006
+    
+    # Model cascade: simple turns go to the fast tier, hard ones (and failed fast answers) to llm_model
+    model_routing_enabled: bool = False
+    llm_fast_model: str = "gpt-4.1-nano"  # Cheaper and faster than llm_model; must differ from it for routing to pay off
+    llm_fast_max_tokens: int = 300
+    llm_fast_cost_per_1k_input: float = 0.0001
+    llm_fast_cost_per_1k_output: float = 0.0004
+    routing_long_message_chars: int = 240
+    
+    # Admission control for upstream (OpenAI) calls
+    upstream_max_concurrency: int = 8
+    upstream_max_queue: int = 32
+    upstream_queue_timeout: float = 10.0
+    load_shed_queue_threshold: int = 24
+    upstream_max_retries: int = 3
+    upstream_retry_base_delay: float = 0.5
+    upstream_retry_max_delay: float = 8.0
+    
+    # Hedged completions (off by default - a hedge doubles the cost of that call)
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_min_delay: float = 1.0
+    llm_hedge_default_delay: float = 6.0
+    llm_hedge_max_fraction: float = 0.1
+    
+    # Per-session conversation state kept in memory
+    conversation_state_max_sessions: int = 10000
+    
+    # Per-session throttling
+    session_rate_limit_per_minute: int = 20
+    session_rate_burst: int = 5
+    
+    # WebSocket chat (/api/chat/ws)
+    ws_heartbeat_interval: float = 20.0  # Ping after this many idle seconds
+    ws_heartbeat_timeout: float = 60.0  # Close if the client has been silent this long
+    ws_send_queue_size: int = 64  # Tokens buffered per connection before generation waits
+    ws_send_timeout: float = 10.0  # Cancel the turn (freeing its upstream slot) if the client stops reading this long
+    
+    # Batch chat endpoint
+    batch_max_parallelism: int = 4
+    batch_max_conversations: int = 5000
+    
+    # Write-behind conversation persistence
+    persistence_enabled: bool = True
+    persistence_queue_size: int = 10000
+    persistence_batch_size: int = 200
+    persistence_flush_interval: float = 1.0
+    export_batch_size: int = 500
+    
+    # Multi-tenant: JSON file describing additional tenants (selected per request by tenant_id)
+    tenants_config_path: Optional[str] = None
+    tenant_max_loaded: int = 8
+    tenant_max_memory_mb: int = 1024
+    tenant_idle_timeout: float = 1800.0  # seconds unused before a tenant is unloaded; 0 disables
     
     # Calendly
     calendly_demo_link: str = "https://calendly.com/eliseai-demo/30min"
@@ -2,12 +2,50 @@ import sqlite3
 
 DB_PATH = "/data/practical.db"
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Conversation log written by services/persistence_service.py.
+# Composite indexes back the time-range and session filters used by exports.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_turns (
+  id INTEGER PRIMARY KEY,
+  session_id TEXT,
+  created_at REAL NOT NULL,
+  user_message TEXT,
+  assistant_response TEXT,
+  tool_used TEXT,
+  latency_ms REAL,
+  prompt_tokens INTEGER,
+  completion_tokens INTEGER,
+  degraded INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chat_turns_created ON chat_turns (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_chat_turns_session ON chat_turns (session_id, created_at, id);
+
+CREATE TABLE IF NOT EXISTS demo_bookings (
+  id INTEGER PRIMARY KEY,
+  session_id TEXT,
+  created_at REAL NOT NULL,
+  reason TEXT,
+  calendly_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_demo_bookings_created ON demo_bookings (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_demo_bookings_session ON demo_bookings (session_id, created_at, id);
+"""
+
+
+def get_db_connection(db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row  # This enables column access by name: row['column_name']
     return conn
 
 
+def init_schema(conn):
+    """Enable WAL so readers never block the writer, and create the conversation tables."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    conn.commit()
+
+
 if __name__ == "__main__":
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -15,4 +53,4 @@ if __name__ == "__main__":
     users = cursor.fetchall()
     print(users)
     cursor.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
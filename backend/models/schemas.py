@@ -29,6 +29,7 @@ class ChatRequest(BaseModel):
     """Request body for chat endpoint."""
     messages: list[Message] = Field(..., description="Conversation history")
     session_id: Optional[str] = Field(None, description="Session identifier")
+    tenant_id: Optional[str] = Field(None, description="Tenant to chat with (default tenant if omitted)")
 
 
 class ChatResponse(BaseModel):
@@ -38,11 +39,19 @@ class ChatResponse(BaseModel):
     sources: Optional[list[Source]] = Field(None, description="Knowledge base sources used")
     tool_used: Optional[str] = Field(None, description="Tool that was called, if any")
     calendly_url: Optional[str] = Field(None, description="Calendly link if demo was booked")
+    degraded: bool = Field(False, description="Whether this is a templated answer served under load")
+
+
+class BatchChatRequest(BaseModel):
+    """Request body for batch chat endpoint."""
+    conversations: list[ChatRequest] = Field(..., description="Independent conversations to run")
+    parallelism: Optional[int] = Field(None, ge=1, description="Conversations to run at once (capped by settings)")
 
 
 class InitChatRequest(BaseModel):
     """Request body for init chat endpoint."""
     session_id: str = Field(..., description="Session identifier")
+    tenant_id: Optional[str] = Field(None, description="Tenant to chat with (default tenant if omitted)")
 
 
 class InitChatResponse(BaseModel):
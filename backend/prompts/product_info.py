@@ -3,6 +3,9 @@ EliseAI Product Information
 Core product descriptions for the AI SDR to reference.
 """
 
+import re
+from functools import lru_cache
+
 PRODUCTS = {
     "LeasingAI": {
         "name": "LeasingAI",
@@ -72,11 +75,17 @@ PRODUCTS = {
 }
 
 
-def get_product_overview() -> str:
-    """Get a formatted overview of all products for the system prompt."""
-    overview = "## EliseAI Products\n\n"
+def get_product_overview(products: dict = None, company_name: str = "EliseAI") -> str:
+    """
+    Get a formatted overview of all products for the system prompt.
+    
+    Args:
+        products: Catalog in the same shape as PRODUCTS (defaults to PRODUCTS)
+        company_name: Company named in the heading
+    """
+    overview = f"## {company_name} Products\n\n"
     
-    for product_id, product in PRODUCTS.items():
+    for product_id, product in (products or PRODUCTS).items():
         overview += f"### {product['name']}: {product['tagline']}\n"
         overview += f"{product['description']}\n\n"
         overview += "Key Features:\n"
@@ -87,7 +96,70 @@ def get_product_overview() -> str:
     return overview
 
 
-def get_product_names() -> list[str]:
-    """Get list of all product names."""
-    return list(PRODUCTS.keys())
+def get_product_names(products: dict = None) -> list[str]:
+    """Get list of all product names (of PRODUCTS unless another catalog is given)."""
+    return list((products or PRODUCTS).keys())
+
+
+def _product_pattern(name: str) -> str:
+    """
+    Build a regex for a product name.
+
+    CamelCase names tolerate spacing and plurals ('Lease Audit' -> LeaseAudits);
+    names the word split cannot rebuild ('acme', '2FA', 'iPhone') match literally.
+    """
+    words = re.findall(r"[A-Z][a-z]+|[A-Z]+(?![a-z])", name)
+    if "".join(words) == name:
+        pattern = r"\s?".join(re.escape(word) for word in words)
+        if pattern.endswith("s"):
+            pattern += "?"
+    else:
+        pattern = re.escape(name)
+    return rf"(?<!\w){pattern}(?!\w)"
+
+
+def build_product_matcher(product_names: list[str]) -> re.Pattern:
+    """
+    Compile one case-insensitive pattern matching any of the given product names.
+
+    Each alternative is a named group, so a single scan finds every product.
+    """
+    alternatives = [
+        f"(?P<p{i}>{_product_pattern(name)})"
+        for i, name in enumerate(product_names)
+    ]
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+_PRODUCT_NAMES = get_product_names()
+_PRODUCT_MATCHER = build_product_matcher(_PRODUCT_NAMES)
+
+
+@lru_cache(maxsize=64)
+def _catalog_matcher(product_names: tuple) -> re.Pattern:
+    """Compiled matcher for another catalog (e.g. a tenant's), built once per catalog."""
+    return build_product_matcher(list(product_names))
+
+
+def match_products(text: str, product_names: list[str] = None) -> list[str]:
+    """
+    Find which catalog products a text mentions, in a single pass.
+
+    Args:
+        text: Text to scan
+        product_names: Catalog to match against (defaults to PRODUCTS)
+
+    Returns:
+        Product names in order of first mention
+    """
+    if product_names is None:
+        names, matcher = _PRODUCT_NAMES, _PRODUCT_MATCHER
+    else:
+        names, matcher = product_names, _catalog_matcher(tuple(product_names))
 
+    found = []
+    for match in matcher.finditer(text):
+        name = names[int(match.lastgroup[1:])]
+        if name not in found:
+            found.append(name)
+    return found
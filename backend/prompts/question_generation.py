@@ -0,0 +1,23 @@
+"""
+Prompt for generating synthetic questions from knowledge base chunks at ingest.
+"""
+
+
+def get_question_generation_prompt(count: int) -> str:
+    """
+    Generate the system prompt asking for likely prospect questions about a chunk.
+
+    Args:
+        count: Number of questions to ask for
+    """
+    return f"""You help index a B2B company's blog for search.
+
+Given one excerpt from an article, write {count} short questions a property manager or healthcare operator might type into a sales chat that this excerpt answers.
+
+Guidelines:
+- Use the prospect's own wording (e.g. "how do I cut delinquency?"), not the article's phrasing
+- Each question must be answerable from the excerpt alone
+- Vary the questions - different angles, not paraphrases of one question
+- Keep each question under 20 words
+
+Respond with JSON: {{"questions": ["...", "..."]}}"""
@@ -0,0 +1,121 @@
+"""
+Quantized Index Export Script
+Reads the chunk embeddings from ChromaDB, optionally reduces their dimensions,
+quantizes them to int8 or float16 and writes a compact .npz index.
+Also reports the recall lost relative to full-precision search.
+
+Usage: python scripts/export_quantized_index.py [--tenant TENANT_ID] [--dtype int8] [--dimensions 512] [--output path]
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+from langchain_community.vectorstores import Chroma
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import get_settings
+from services.quantized_index import QuantizedIndex, evaluate_recall
+from services.kb_index import QUANTIZED_INDEX_FILE, active_index_path, read_manifest, write_manifest
+from services.tenants import UnknownTenantError, get_tenant
+
+
+def load_embeddings(persist_directory: str, page_size: int = 1000) -> tuple[list[str], np.ndarray, list[dict]]:
+    """Page through the Chroma collection and collect ids, embeddings and metadata."""
+    vectorstore = Chroma(
+        persist_directory=persist_directory,
+        collection_name="eliseai_articles"
+    )
+
+    ids = []
+    vectors = []
+    metadatas = []
+    offset = 0
+    while True:
+        page = vectorstore.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        vectors.extend(page["embeddings"])
+        metadatas.extend(page["metadatas"])
+        offset += len(page["ids"])
+
+    print(f"✅ Loaded {len(ids)} embeddings from ChromaDB")
+    return ids, np.asarray(vectors, dtype=np.float32), metadatas
+
+
+def main():
+    """Export the quantized index and report size and recall."""
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description="Export a quantized embedding index")
+    parser.add_argument("--tenant", help="Tenant id from the tenants file (default: the built-in tenant)")
+    parser.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--dimensions", type=int, default=None, help="Truncate embeddings to this many dimensions")
+    parser.add_argument("--output", default=None, help="Default: inside the active build")
+    parser.add_argument("--eval-queries", type=int, default=200, help="Stored chunks reused as recall queries (each left out of its own results)")
+    parser.add_argument("--k", type=int, default=settings.rag_top_k)
+    args = parser.parse_args()
+
+    try:
+        tenant = get_tenant(args.tenant, settings)
+    except UnknownTenantError:
+        raise SystemExit(f"❌ Unknown tenant '{args.tenant}' - check TENANTS_CONFIG_PATH")
+    index_root = tenant.chroma_persist_directory
+
+    manifest = read_manifest(index_root)
+    index_path = active_index_path(index_root)
+    if manifest is not None or tenant.tenant_id != "default":
+        # Versioned builds keep their quantized index next to the collections
+        default_output = os.path.join(index_path, QUANTIZED_INDEX_FILE)
+    else:
+        default_output = settings.quantized_index_path or os.path.join(index_path, QUANTIZED_INDEX_FILE)
+    args.output = args.output or default_output
+
+    print("=" * 60)
+    print("EliseAI Quantized Index Export")
+    print("=" * 60)
+
+    ids, vectors, metadatas = load_embeddings(index_path)
+    if not ids:
+        print("❌ No embeddings found. Run scripts/ingest_articles.py first.")
+        return
+
+    index = QuantizedIndex.build(ids, vectors, dtype=args.dtype, dimensions=args.dimensions, metadatas=metadatas)
+    index.save(args.output)
+
+    full_bytes = vectors.nbytes
+    print(f"\n📊 Size:")
+    print(f"  - Full precision: {vectors.shape[1]} dims, {full_bytes / 1024:.0f} KB")
+    print(f"  - Quantized:      {index.dimensions} dims {index.dtype}, {index.nbytes / 1024:.0f} KB "
+          f"({full_bytes / max(index.nbytes, 1):.1f}x smaller)")
+    print(f"  - File on disk:   {os.path.getsize(args.output) / 1024:.0f} KB at {args.output}")
+
+    # Recall is measured against exact search in the stored (full) embedding space
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(vectors), size=min(args.eval_queries, len(vectors)), replace=False)
+    queries = vectors[sample]
+
+    recall = evaluate_recall(index, vectors, queries, args.k, query_rows=sample.tolist())
+    rescored = evaluate_recall(
+        index, vectors, queries, args.k,
+        rescore_factor=settings.quantized_rescore_factor,
+        query_rows=sample.tolist()
+    )
+
+    print(f"\n🎯 Recall@{args.k} vs full precision ({len(queries)} queries):")
+    print(f"  - Quantized only: {recall:.3f}")
+    print(f"  - With rescoring of top {args.k * settings.quantized_rescore_factor}: {rescored:.3f}")
+    current = read_manifest(index_root)
+    if manifest is not None and current is not None and current["version"] == manifest["version"] and \
+            os.path.abspath(args.output) == os.path.abspath(default_output):
+        # Republish the build so running servers reload it with the quantized index
+        write_manifest(index_root, {**current, "quantized_index": QUANTIZED_INDEX_FILE})
+        print(f"\nRecorded in the manifest for build {manifest['version']} - running servers will reload it.")
+    else:
+        print(f"\nSet QUANTIZED_INDEX_PATH={args.output} to search this index.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 """
 Article Ingestion Script
 Loads all JSON articles, chunks them, generates embeddings, and stores in ChromaDB.
-Run this once to populate the vector database.
+Each run writes a new versioned build and then points the CURRENT manifest at it;
+a running API picks the new build up without a restart.
 
-Usage: python scripts/ingest_articles.py
+Usage: python scripts/ingest_articles.py [--tenant TENANT_ID]
 """
 
+import argparse
 import json
 import os
+import time
 from pathlib import Path
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
@@ -17,6 +20,11 @@ import sys
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import get_settings
+from services.kb_metadata import tag_chunk, chunk_id, filter_fields
+from services.question_generation import load_question_generator
+from services.kb_dedup import dedup_chunks
+from services.kb_index import new_version, version_path, write_manifest, prune_versions
+from services.tenants import Tenant, UnknownTenantError, get_tenant
 
 
 def load_articles(articles_dir: str) -> list[dict]:
@@ -35,6 +43,7 @@ def load_articles(articles_dir: str) -> list[dict]:
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 article = json.load(f)
+                article.setdefault('article_id', file_path.stem)
                 articles.append(article)
         except Exception as e:
             print(f"⚠️  Error loading {file_path.name}: {e}")
@@ -43,9 +52,15 @@ def load_articles(articles_dir: str) -> list[dict]:
     return articles
 
 
-def chunk_articles(articles: list[dict], chunk_size: int, chunk_overlap: int) -> tuple[list[str], list[dict]]:
+def chunk_articles(
+    articles: list[dict],
+    chunk_size: int,
+    chunk_overlap: int,
+    product_names: list[str] = None
+) -> tuple[list[str], list[dict]]:
     """
     Chunk article content and prepare metadata.
+    Each chunk is tagged with the catalog products it mentions and a sortable date.
     Returns: (chunks, metadata_list)
     """
     text_splitter = RecursiveCharacterTextSplitter(
@@ -64,6 +79,7 @@ def chunk_articles(articles: list[dict], chunk_size: int, chunk_overlap: int) ->
         date = article.get('date', 'N/A')
         summary = article.get('summary', '')
         content = article.get('main_content', '')
+        article_id = article.get('article_id', title)
         
         # Combine summary and content for chunking
         full_text = f"# {title}\n\n{summary}\n\n{content}"
@@ -78,27 +94,115 @@ def chunk_articles(articles: list[dict], chunk_size: int, chunk_overlap: int) ->
                 'title': title,
                 'author': author,
                 'date': date,
+                'article_id': article_id,
                 'chunk_index': i,
-                'total_chunks': len(chunks)
+                'total_chunks': len(chunks),
+                **tag_chunk(chunk, title, date, product_names)
             })
     
-    print(f"✅ Created {len(all_chunks)} chunks from {len(articles)} articles")
+    tagged = sum(1 for m in all_metadata if m['products'])
+    print(f"✅ Created {len(all_chunks)} chunks from {len(articles)} articles ({tagged} tagged with products)")
     return all_chunks, all_metadata
 
 
-def create_vector_store(chunks: list[str], metadata: list[dict], settings) -> Chroma:
-    """Create and populate ChromaDB vector store."""
+def collapse_duplicates(chunks: list[str], metadata: list[dict], product_names: list[str], settings) -> tuple[list[str], list[dict], dict]:
+    """
+    Merge near-duplicate chunks (repeated recap paragraphs, chunk overlap) into one
+    canonical chunk that cites every source, and report how much the index shrinks.
+    Returns: (chunks, metadata_list, report)
+    """
+    chunks, metadata, report = dedup_chunks(
+        chunks,
+        metadata,
+        product_names,
+        threshold=settings.dedup_threshold,
+        num_perm=settings.dedup_num_perm,
+        shingle_size=settings.dedup_shingle_size
+    )
+    
+    print(
+        f"✅ Collapsed {report['removed']} near-duplicate chunks in {report['groups']} groups "
+        f"({report['chunks_before']} → {report['chunks_after']} chunks, -{report['removed_pct']}%; "
+        f"{report['chars_before']:,} → {report['chars_after']:,} characters) in {report['seconds']}s"
+    )
+    return chunks, metadata, report
+
+
+def prepare_summaries(articles: list[dict], product_names: list[str] = None) -> tuple[list[str], list[dict]]:
+    """
+    Prepare one summary document per article for the article-level index.
+    Tags use the whole article so product filters match the chunk-level tags.
+    Returns: (summaries, metadata_list)
+    """
+    summaries = []
+    metadata = []
+    
+    for article in articles:
+        title = article.get('title', 'Untitled')
+        date = article.get('date', 'N/A')
+        summary = article.get('summary', '')
+        content = article.get('main_content', '')
+        
+        summaries.append(f"# {title}\n\n{summary}")
+        metadata.append({
+            'title': title,
+            'author': article.get('author', 'Unknown'),
+            'date': date,
+            'article_id': article.get('article_id', title),
+            **tag_chunk(f"{summary}\n{content}", title, date, product_names)
+        })
+    
+    return summaries, metadata
+
+
+def generate_questions(chunks: list[str], metadata: list[dict], generator, per_chunk: int) -> tuple[list[str], list[dict]]:
+    """
+    Generate synthetic questions for every chunk.
+    Each question points at its parent chunk and carries its filter fields,
+    so product and date filters apply to question matches too.
+    Returns: (questions, metadata_list)
+    """
+    questions = []
+    question_metadata = []
+    
+    for i, (chunk, meta) in enumerate(zip(chunks, metadata), 1):
+        try:
+            generated = generator.generate(chunk, meta, per_chunk)
+        except Exception as e:
+            print(f"⚠️  Question generation failed for chunk {chunk_id(meta['article_id'], meta['chunk_index'])}: {e}")
+            continue
+        
+        for question in generated[:per_chunk]:
+            questions.append(question)
+            question_metadata.append({
+                'parent_id': chunk_id(meta['article_id'], meta['chunk_index']),
+                'title': meta['title'],
+                **filter_fields(meta)
+            })
+        
+        if i % 100 == 0:
+            print(f"  ... {i}/{len(chunks)} chunks")
+    
+    print(f"✅ Generated {len(questions)} questions for {len(chunks)} chunks")
+    return questions, question_metadata
+
+
+def get_embeddings(settings) -> OpenAIEmbeddings:
+    """Create the embeddings model used for every collection."""
     print("🔄 Initializing embeddings model...")
     
     # Set API key in environment for OpenAI
-    import os
     os.environ["OPENAI_API_KEY"] = settings.openai_api_key
     
-    embeddings = OpenAIEmbeddings(
-        model=settings.embedding_model
+    return OpenAIEmbeddings(
+        model=settings.embedding_model,
+        dimensions=settings.embedding_dimensions
     )
-    
-    print(f"🔄 Creating vector store at: {settings.chroma_persist_directory}")
+
+
+def create_vector_store(chunks: list[str], metadata: list[dict], embeddings, persist_directory: str) -> Chroma:
+    """Create and populate ChromaDB vector store."""
+    print(f"🔄 Creating vector store at: {persist_directory}")
     print("⏳ This may take a few minutes...")
     
     # Create the vector store
@@ -106,7 +210,8 @@ def create_vector_store(chunks: list[str], metadata: list[dict], settings) -> Ch
         texts=chunks,
         embedding=embeddings,
         metadatas=metadata,
-        persist_directory=settings.chroma_persist_directory,
+        ids=[chunk_id(m['article_id'], m['chunk_index']) for m in metadata],
+        persist_directory=persist_directory,
         collection_name="eliseai_articles"
     )
     
@@ -114,25 +219,74 @@ def create_vector_store(chunks: list[str], metadata: list[dict], settings) -> Ch
     return vectorstore
 
 
+def create_summary_store(summaries: list[str], metadata: list[dict], embeddings, persist_directory: str) -> Chroma:
+    """Create the article-level summary collection used for two-stage retrieval."""
+    summary_store = Chroma.from_texts(
+        texts=summaries,
+        embedding=embeddings,
+        metadatas=metadata,
+        persist_directory=persist_directory,
+        collection_name="eliseai_article_summaries"
+    )
+    
+    print(f"✅ Summary index created with {len(summaries)} articles!")
+    return summary_store
+
+
+def create_question_store(questions: list[str], metadata: list[dict], embeddings, persist_directory: str) -> Chroma:
+    """Create the synthetic question collection; each entry points at a chunk via parent_id."""
+    question_store = Chroma.from_texts(
+        texts=questions,
+        embedding=embeddings,
+        metadatas=metadata,
+        persist_directory=persist_directory,
+        collection_name="eliseai_chunk_questions"
+    )
+    
+    print(f"✅ Question index created with {len(questions)} questions!")
+    return question_store
+
+
+def resolve_tenant(tenant_id: str, settings) -> Tenant:
+    """Find the tenant to ingest for; without --tenant the default tenant's settings are used."""
+    try:
+        tenant = get_tenant(tenant_id, settings)
+    except UnknownTenantError:
+        raise SystemExit(f"❌ Unknown tenant '{tenant_id}' - check TENANTS_CONFIG_PATH")
+    if not tenant.articles_directory:
+        raise SystemExit(f"❌ Tenant '{tenant_id}' has no articles_directory")
+    return tenant
+
+
 def main():
     """Main ingestion pipeline."""
+    parser = argparse.ArgumentParser(description="Build a knowledge base index from articles.")
+    parser.add_argument("--tenant", help="Tenant id from the tenants file (default: the built-in tenant)")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("EliseAI Article Ingestion Script")
     print("=" * 60)
     
     # Load settings
     settings = get_settings()
+    tenant = resolve_tenant(args.tenant, settings)
+    index_root = tenant.chroma_persist_directory
     
     print(f"\n📋 Configuration:")
-    print(f"  Articles directory: {settings.articles_directory}")
-    print(f"  ChromaDB directory: {settings.chroma_persist_directory}")
+    print(f"  Tenant: {tenant.tenant_id}")
+    print(f"  Articles directory: {tenant.articles_directory}")
+    print(f"  ChromaDB directory: {index_root}")
     print(f"  Chunk size: {settings.chunk_size}")
     print(f"  Chunk overlap: {settings.chunk_overlap}")
-    print(f"  Embedding model: {settings.embedding_model}\n")
+    print(f"  Embedding model: {settings.embedding_model}")
+    print(f"  Embedding dimensions: {settings.embedding_dimensions or 'model default'}")
+    print(f"  Dedup threshold: {settings.dedup_threshold if settings.dedup_enabled else 'disabled'}")
+    print(f"  Question generator: {settings.question_generator or 'disabled'}\n")
     
     # Step 1: Load articles
     print("Step 1: Loading articles...")
-    articles = load_articles(settings.articles_directory)
+    articles = load_articles(tenant.articles_directory)
     
     if not articles:
         print("❌ No articles found. Exiting.")
@@ -143,12 +297,49 @@ def main():
     chunks, metadata = chunk_articles(
         articles,
         settings.chunk_size,
-        settings.chunk_overlap
+        settings.chunk_overlap,
+        tenant.product_names
     )
+    dedup_report = None
+    if settings.dedup_enabled:
+        chunks, metadata, dedup_report = collapse_duplicates(chunks, metadata, tenant.product_names, settings)
     
-    # Step 3: Create vector store
+    # Step 3: Create vector store in a new build directory
     print("\nStep 3: Creating vector store...")
-    vectorstore = create_vector_store(chunks, metadata, settings)
+    version = new_version()
+    build_directory = version_path(index_root, version)
+    embeddings = get_embeddings(settings)
+    vectorstore = create_vector_store(chunks, metadata, embeddings, build_directory)
+    
+    # Step 4: Create article summary index
+    print("\nStep 4: Creating article summary index...")
+    summaries, summary_metadata = prepare_summaries(articles, tenant.product_names)
+    create_summary_store(summaries, summary_metadata, embeddings, build_directory)
+    
+    # Step 5 (optional): Synthetic questions pointing at their chunks
+    questions = []
+    if settings.question_generator:
+        print("\nStep 5: Generating synthetic questions...")
+        generator = load_question_generator(settings.question_generator, settings)
+        questions, question_metadata = generate_questions(chunks, metadata, generator, settings.questions_per_chunk)
+        if questions:
+            create_question_store(questions, question_metadata, embeddings, build_directory)
+    
+    # Step 6: Publish the build - running servers switch to it on their next poll
+    print("\nStep 6: Publishing index build...")
+    write_manifest(index_root, {
+        "version": version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "articles": len(articles),
+        "chunks": len(chunks),
+        "summaries": len(summaries),
+        "questions": len(questions),
+        "dedup": dedup_report,
+        "embedding_model": settings.embedding_model,
+        "embedding_dimensions": settings.embedding_dimensions
+    })
+    removed = prune_versions(index_root, settings.index_keep_versions)
+    print(f"✅ Build {version} is now current" + (f" (removed {len(removed)} old builds)" if removed else ""))
     
     print("\n" + "=" * 60)
     print("✅ INGESTION COMPLETE!")
@@ -156,7 +347,11 @@ def main():
     print(f"📊 Summary:")
     print(f"  - {len(articles)} articles processed")
     print(f"  - {len(chunks)} chunks created")
-    print(f"  - Vector store ready at: {settings.chroma_persist_directory}")
+    if dedup_report:
+        print(f"  - {dedup_report['removed']} near-duplicate chunks merged (-{dedup_report['removed_pct']}%)")
+    if questions:
+        print(f"  - {len(questions)} synthetic questions indexed")
+    print(f"  - Vector store ready at: {build_directory}")
     print("\n🚀 Your RAG system is ready to use!")
 
 
@@ -0,0 +1,225 @@
+"""
+Admission Control - Upstream Concurrency, Retries and Throttling
+Bounds concurrent OpenAI calls, retries rate limits with backoff,
+and throttles per-session request rates.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from config import get_settings
+
+
+class OverloadedError(Exception):
+    """Raised when an upstream call cannot be admitted or keeps getting rate limited."""
+
+
+class AdmissionController:
+    """
+    Global limiter for upstream API calls.
+
+    At most max_concurrency calls run at once. Further callers wait in a
+    bounded queue; when the queue is full (or the wait times out) the call is
+    rejected with OverloadedError instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        shed_threshold: int
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrency: Maximum number of concurrent upstream calls
+            max_queue: Maximum number of callers waiting for a slot
+            queue_timeout: Seconds a caller may wait for a slot
+            shed_threshold: Queue depth at which new chat turns are served degraded
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.shed_threshold = shed_threshold
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._shed = 0
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once a concurrency slot is available.
+
+        Raises:
+            OverloadedError: If the wait queue is full or the wait times out
+        """
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise OverloadedError("Upstream wait queue is full")
+            self._waiting += 1
+
+        acquired = self._slots.acquire(timeout=self.queue_timeout)
+
+        with self._lock:
+            self._waiting -= 1
+            if not acquired:
+                self._rejected += 1
+            else:
+                self._active += 1
+                self._admitted += 1
+
+        if not acquired:
+            raise OverloadedError("Timed out waiting for an upstream slot")
+
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def should_shed(self) -> bool:
+        """Check whether new work should get a degraded response instead of an upstream call."""
+        with self._lock:
+            shed = self._waiting >= self.shed_threshold
+            if shed:
+                self._shed += 1
+            return shed
+
+    def get_stats(self) -> dict:
+        """Get current queue depth and admission counters."""
+        with self._lock:
+            return {
+                "active": self._active,
+                "waiting": self._waiting,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "shed": self._shed
+            }
+
+
+def call_with_backoff(
+    fn,
+    retry_on: tuple,
+    max_retries: int,
+    base_delay: float,
+    max_delay: float
+):
+    """
+    Call fn(), retrying with jittered exponential backoff on the given errors.
+
+    Args:
+        fn: Zero-argument callable
+        retry_on: Exception types that should be retried
+        max_retries: Maximum number of retries after the first attempt
+        base_delay: Backoff delay before the first retry, in seconds
+        max_delay: Upper bound for a single backoff delay, in seconds
+
+    Returns:
+        The result of fn()
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except retry_on:
+            if attempt >= max_retries:
+                raise
+            # Full jitter: sleep a random amount up to the exponential cap
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(random.uniform(0, delay))
+            attempt += 1
+
+
+class SessionThrottle:
+    """Token-bucket rate limiter keyed by session id."""
+
+    def __init__(self, rate_per_minute: int, burst: int, max_sessions: int = 10000):
+        """
+        Initialize the throttle.
+
+        Args:
+            rate_per_minute: Sustained requests allowed per session per minute
+            burst: Requests a session may make back-to-back
+            max_sessions: Number of session buckets to keep before evicting the oldest
+        """
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._throttled = 0
+
+    def allow(self, session_id: str) -> bool:
+        """
+        Consume one token for the session if available.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if the request may proceed
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(session_id, (float(self.burst), now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate_per_second)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self._throttled += 1
+
+            self._buckets[session_id] = (tokens, now)
+            if len(self._buckets) > self.max_sessions:
+                self._buckets.popitem(last=False)
+
+            return allowed
+
+    def get_stats(self) -> dict:
+        """Get throttle counters."""
+        with self._lock:
+            return {
+                "tracked_sessions": len(self._buckets),
+                "throttled": self._throttled
+            }
+
+
+# Singleton instances
+_admission_controller_instance = None
+_session_throttle_instance = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the global admission controller singleton."""
+    global _admission_controller_instance
+    if _admission_controller_instance is None:
+        settings = get_settings()
+        _admission_controller_instance = AdmissionController(
+            max_concurrency=settings.upstream_max_concurrency,
+            max_queue=settings.upstream_max_queue,
+            queue_timeout=settings.upstream_queue_timeout,
+            shed_threshold=settings.load_shed_queue_threshold
+        )
+    return _admission_controller_instance
+
+
+def get_session_throttle() -> SessionThrottle:
+    """Get or create the per-session throttle singleton."""
+    global _session_throttle_instance
+    if _session_throttle_instance is None:
+        settings = get_settings()
+        _session_throttle_instance = SessionThrottle(
+            rate_per_minute=settings.session_rate_limit_per_minute,
+            burst=settings.session_rate_burst
+        )
+    return _session_throttle_instance
@@ -0,0 +1,157 @@
+"""
+Batch Service - Bulk Conversation Replay
+Runs many independent conversations concurrently for offline evaluation.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional
+from config import get_settings
+from models.schemas import ChatRequest, ChatResponse
+from services.tenants import UnknownTenantError, get_tenant_chat_service
+from services.tracing import get_tracer
+
+
+class BatchService:
+    """Service for replaying conversations in bulk."""
+
+    def __init__(self, chat_service):
+        """
+        Initialize the batch service.
+
+        Args:
+            chat_service: ChatService instance that handles conversations without a tenant_id
+        """
+        self.settings = get_settings()
+        self.chat_service = chat_service
+
+    def run(self, conversations: list[ChatRequest], parallelism: Optional[int] = None) -> Iterator[dict]:
+        """
+        Run conversations concurrently, yielding results as they complete.
+
+        Degraded (load-shed) answers are never returned - an overloaded upstream
+        shows up as an error item so it cannot be mistaken for a real reply.
+
+        Args:
+            conversations: Chat requests to run
+            parallelism: Requested concurrency (capped by settings.batch_max_parallelism)
+
+        Yields:
+            One 'result' or 'error' dict per conversation, then a final 'summary' dict
+        """
+        workers = min(parallelism or self.settings.batch_max_parallelism, self.settings.batch_max_parallelism)
+        started = time.monotonic()
+        latencies = []
+        tokens = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        failed = 0
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        try:
+            futures = {
+                executor.submit(self._run_one, conversation): index
+                for index, conversation in enumerate(conversations)
+            }
+
+            for future in as_completed(futures):
+                index = futures[future]
+                item = future.result()
+                item["index"] = index
+                item["session_id"] = conversations[index].session_id
+
+                if item["type"] == "error":
+                    failed += 1
+                else:
+                    latencies.append(item["latency_ms"])
+                    for key in tokens:
+                        tokens[key] += item["usage"].get(key, 0)
+
+                yield item
+        finally:
+            # Stop queued conversations if the client disconnects mid-stream
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        yield {
+            "type": "summary",
+            "count": len(conversations),
+            "succeeded": len(latencies),
+            "failed": failed,
+            "parallelism": workers,
+            "wall_time_ms": round((time.monotonic() - started) * 1000, 1),
+            "latency_ms": self._latency_stats(latencies),
+            "tokens": tokens
+        }
+
+    def _run_one(self, conversation: ChatRequest) -> dict:
+        """Run a single conversation and time it."""
+        started = time.monotonic()
+        tracer = get_tracer()
+        try:
+            with tracer.span("batch.conversation"):
+                tracer.set_session(conversation.session_id)
+                chat_service = self._chat_service_for(conversation.tenant_id)
+                result = chat_service.handle_message(conversation.messages, allow_degraded=False)
+        except Exception as e:
+            return {
+                "type": "error",
+                "error": str(e),
+                "latency_ms": round((time.monotonic() - started) * 1000, 1)
+            }
+
+        response = ChatResponse(
+            response=result["response"],
+            quick_replies=result.get("quick_replies"),
+            sources=result.get("sources"),
+            tool_used=result.get("tool_used"),
+            calendly_url=result.get("calendly_url")
+        )
+
+        return {
+            "type": "result",
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            "usage": result.get("usage") or {},
+            "result": response.model_dump()
+        }
+
+    def _chat_service_for(self, tenant_id: Optional[str]):
+        """
+        Pick the chat service for a conversation's tenant.
+
+        Raises:
+            ValueError: If the tenant is not configured
+        """
+        if tenant_id is None:
+            return self.chat_service
+        try:
+            return get_tenant_chat_service(tenant_id)
+        except UnknownTenantError:
+            raise ValueError(f"Unknown tenant '{tenant_id}'")
+
+    @staticmethod
+    def _latency_stats(latencies: list[float]) -> dict:
+        """Summarize latencies as mean and percentiles."""
+        if not latencies:
+            return {"mean": None, "p50": None, "p95": None, "max": None}
+
+        ordered = sorted(latencies)
+
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+        return {
+            "mean": round(sum(ordered) / len(ordered), 1),
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "max": ordered[-1]
+        }
+
+
+# Singleton instance
+_batch_service_instance = None
+
+
+def get_batch_service(chat_service) -> BatchService:
+    """Get or create batch service singleton."""
+    global _batch_service_instance
+    if _batch_service_instance is None:
+        _batch_service_instance = BatchService(chat_service)
+    return _batch_service_instance
@@ -3,21 +3,49 @@ Chat Service - Main Orchestration
 Coordinates RAG, LLM, and conversation logic for the AI SDR.
 """
 
-from services.rag_service import get_rag_service
-from services.llm_service import get_llm_service
+from typing import Optional
+from config import get_settings
+from services.rag_service import RAGService, get_rag_service
+from services.llm_service import LLMService, get_llm_service
 from prompts.system_prompt import get_system_prompt
-from prompts.product_info import get_product_names
+from services.admission import get_admission_controller, OverloadedError
+from services.conversation_state import ConversationState, ConversationStateStore, get_conversation_state_store
+from services.tenants import Tenant
+from services.tracing import get_tracer
 from models.schemas import Message, QuickReply, Source
 
 
 class ChatService:
     """Main service for handling chat conversations."""
     
-    def __init__(self):
-        """Initialize chat service with RAG and LLM services."""
-        self.rag_service = get_rag_service()
-        self.llm_service = get_llm_service(self.rag_service)
-        self.system_prompt = get_system_prompt()
+    def __init__(self, tenant: Optional[Tenant] = None):
+        """
+        Initialize chat service with RAG and LLM services.
+        
+        Args:
+            tenant: Tenant to serve. Without one, the default EliseAI tenant is
+                served using the shared RAG, LLM and conversation state singletons.
+        """
+        settings = get_settings()
+        if tenant is None:
+            self.tenant = Tenant.default(settings)
+            self.rag_service = get_rag_service()
+            self.llm_service = get_llm_service(self.rag_service)
+            self.state_store = get_conversation_state_store()
+        else:
+            self.tenant = tenant
+            self.rag_service = RAGService(tenant.chroma_persist_directory, tenant.product_names)
+            self.llm_service = LLMService(self.rag_service, tenant)
+            self.state_store = ConversationStateStore(settings.conversation_state_max_sessions, tenant.product_names)
+        
+        self.system_prompt = get_system_prompt(
+            assistant_name=self.tenant.assistant_name,
+            company_name=self.tenant.company_name,
+            company_description=self.tenant.company_description,
+            products=self.tenant.products
+        )
+        self.admission = get_admission_controller()
+        self.tracer = get_tracer()
     
     def get_initial_greeting(self) -> dict:
         """
@@ -26,23 +54,15 @@ class ChatService:
         Returns:
             Dict with response and optional quick_replies
         """
-        greeting = (
-            "Hi! I'm Alex, an AI assistant with EliseAI. "
-            "We help property management and healthcare organizations automate operations "
-            "and improve efficiency with AI-powered solutions. "
-            "\n\nWhat brings you here today - are you in property management, healthcare, "
-            "or something else?"
-        )
-        
         return {
-            "response": greeting,
+            "response": self.tenant.greeting,
             "quick_replies": None,  # No buttons on first message
             "sources": [],
             "tool_used": None,
             "calendly_url": None
         }
     
-    def should_show_product_buttons(self, messages: list[Message]) -> bool:
+    def should_show_product_buttons(self, state: ConversationState) -> bool:
         """
         Determine if we should show product selection buttons.
         
@@ -51,64 +71,107 @@ class ChatService:
         - Conversation is still in early stage
         
         Args:
-            messages: Conversation history
+            state: Conversation state synced with the history (before this reply)
         
         Returns:
             True if product buttons should be shown
         """
-        # Count assistant messages (excluding system prompt)
-        assistant_count = sum(1 for m in messages if m.role == "assistant")
+        # Only show on 2nd assistant message, and only if they haven't focused on a product
+        return state.assistant_count == 1 and not state.products_mentioned
+    
+    def get_product_quick_replies(self) -> list[QuickReply]:
+        """Get quick reply buttons for product selection."""
+        return [QuickReply(**quick_reply) for quick_reply in self.tenant.quick_replies]
+    
+    def get_degraded_response(self, state: ConversationState) -> dict:
+        """
+        Build a templated answer without calling OpenAI, used while shedding load.
         
-        # Only show on 2nd assistant message
-        if assistant_count != 1:
-            return False
+        Answers from the product catalog for the most recently mentioned product,
+        or gives a short overview and product buttons if none was mentioned.
         
-        # Check if user has mentioned specific products
-        product_names = get_product_names()
-        user_messages = [m.content.lower() for m in messages if m.role == "user"]
+        Args:
+            state: Conversation state synced with the history
         
-        for msg in user_messages:
-            for product in product_names:
-                if product.lower() in msg:
-                    return False  # They've already focused on a product
+        Returns:
+            Dict in the same shape as handle_message()
+        """
+        product = state.last_product
+        
+        if product:
+            info = self.tenant.products[product]
+            features = "\n".join(f"- {feature}" for feature in info["key_features"][:3])
+            text = (
+                f"{info['name']} is our {info['tagline']}. {info['description']}\n\n"
+                f"Key features include:\n{features}\n\n"
+                f"Would you like to book a demo to see {info['name']} in action?"
+            )
+            quick_replies = None
+        else:
+            text = f"{self.tenant.pitch} Which of these areas would you like to hear more about?"
+            quick_replies = self.get_product_quick_replies()
         
-        return True
-    
-    def get_product_quick_replies(self) -> list[QuickReply]:
-        """Get quick reply buttons for product selection."""
-        return [
-            QuickReply(label="🏢 LeasingAI", value="Tell me about LeasingAI"),
-            QuickReply(label="🔧 MaintenanceAI", value="Tell me about MaintenanceAI"),
-            QuickReply(label="💰 DelinquencyAI", value="Tell me about DelinquencyAI"),
-            QuickReply(label="📋 LeaseAudits", value="Tell me about LeaseAudits"),
-            QuickReply(label="📊 EliseCRM", value="Tell me about EliseCRM"),
-            QuickReply(label="💬 Discuss my needs", value="I'd like to discuss my specific challenges")
-        ]
+        return {
+            "response": text,
+            "sources": [],
+            "tool_used": None,
+            "quick_replies": quick_replies,
+            "calendly_url": None,
+            "degraded": True
+        }
     
-    def handle_message(self, messages: list[Message]) -> dict:
+    def handle_message(
+        self,
+        messages: list[Message],
+        allow_degraded: bool = True,
+        session_id: str = None,
+        state: ConversationState = None,
+        on_token=None
+    ) -> dict:
         """
         Handle an incoming message and generate a response.
         
+        Falls back to get_degraded_response() when upstream capacity is exhausted.
+        
         Args:
             messages: Full conversation history
+            allow_degraded: If False, raise OverloadedError instead of serving a degraded answer
+            session_id: Session whose conversation state should be reused
+            state: Conversation state owned by the caller (e.g. a WebSocket
+                connection); used instead of the session store when given
+            on_token: Stream the reply, passing each content delta to this callback
         
         Returns:
             Dict with response, quick_replies, sources, etc.
         """
-        # Build conversation for LLM (system prompt + messages)
-        llm_messages = [
-            {"role": "system", "content": self.system_prompt}
-        ]
-        
-        # Add conversation history
-        for msg in messages:
-            llm_messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+        with self.tracer.span("chat.prompt_assembly", messages=len(messages)):
+            if state is not None:
+                state.sync(messages)
+            else:
+                state = self.state_store.get(session_id, messages)
+            
+            if allow_degraded and self.admission.should_shed():
+                return self.get_degraded_response(state)
+            
+            # Build conversation for LLM (system prompt + messages)
+            llm_messages = [
+                {"role": "system", "content": self.system_prompt}
+            ]
+            
+            # Add conversation history
+            for msg in messages:
+                llm_messages.append({
+                    "role": msg.role,
+                    "content": msg.content
+                })
         
         # Get response from LLM (with potential tool calls)
-        llm_result = self.llm_service.chat_completion(llm_messages)
+        try:
+            llm_result = self.llm_service.chat_completion(llm_messages, state=state, on_token=on_token)
+        except OverloadedError:
+            if not allow_degraded:
+                raise
+            return self.get_degraded_response(state)
         
         # Prepare response
         response = {
@@ -123,19 +186,37 @@ class ChatService:
             ],
             "tool_used": llm_result.get("tool_used"),
             "quick_replies": None,
-            "calendly_url": None
+            "calendly_url": None,
+            "degraded": False,
+            "usage": llm_result.get("usage"),
+            "tool_args": llm_result.get("tool_args")
         }
         
         # Add Calendly link if demo was booked
         if llm_result.get("tool_used") == "book_demo":
             tool_result = llm_result.get("tool_result", {})
             response["calendly_url"] = tool_result.get("calendly_url")
+            state.mark_demo_booked()
         
         # Add product buttons if appropriate
-        if self.should_show_product_buttons(messages):
+        if self.should_show_product_buttons(state):
             response["quick_replies"] = self.get_product_quick_replies()
         
         return response
+    
+    def close(self) -> None:
+        """Release background resources when the service is evicted."""
+        self.rag_service.close()
+        self.llm_service.close()
+    
+    def get_stats(self) -> dict:
+        """Get counters from the underlying services."""
+        return {
+            "rag": self.rag_service.get_stats(),
+            "llm": self.llm_service.get_stats(),
+            "admission": self.admission.get_stats(),
+            "conversation_state": self.state_store.get_stats()
+        }
 
 
 # Singleton instance
@@ -0,0 +1,172 @@
+"""
+Conversation State - Incremental Per-Session Tracking
+Keeps running facts about each conversation so per-turn decisions
+don't rescan the full history.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+from config import get_settings
+from models.schemas import Message
+from prompts.product_info import match_products
+
+
+DEMO_PATTERN = re.compile(r"\bdemo\b", re.IGNORECASE)
+
+
+class ConversationState:
+    """Running summary of one conversation, updated one message at a time."""
+
+    def __init__(self, product_names: list[str] = None):
+        """
+        Initialize an empty conversation.
+
+        Args:
+            product_names: Catalog to detect product mentions against (defaults to PRODUCTS)
+        """
+        self.product_names = product_names
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything applied so far."""
+        self.message_count = 0
+        self.turn_count = 0
+        self.assistant_count = 0
+        self.products_mentioned: list[str] = []
+        self.last_product: Optional[str] = None
+        self.demo_offered = False
+        self.demo_booked = False
+        self._last_fingerprint = None
+
+    @property
+    def stage(self) -> str:
+        """Funnel stage matching the system prompt's conversation flow."""
+        if self.demo_booked or self.demo_offered:
+            return "close"
+        if self.products_mentioned:
+            return "educate"
+        if self.turn_count > 0:
+            return "qualify"
+        return "greet"
+
+    def apply(self, message: Message) -> None:
+        """
+        Update the state with the next message in the conversation.
+
+        Args:
+            message: The message following everything applied so far
+        """
+        self.message_count += 1
+        self._last_fingerprint = self._fingerprint(message)
+
+        if message.role == "user":
+            self.turn_count += 1
+            for product in match_products(message.content, self.product_names):
+                if product not in self.products_mentioned:
+                    self.products_mentioned.append(product)
+                self.last_product = product
+        elif message.role == "assistant":
+            self.assistant_count += 1
+            if DEMO_PATTERN.search(message.content):
+                self.demo_offered = True
+
+    def sync(self, messages: list[Message]) -> "ConversationState":
+        """
+        Apply any messages not yet seen.
+
+        The client resends the full history each turn, so only the tail past
+        message_count is new. If the history no longer extends what was applied
+        (e.g. the chat was cleared), the state is rebuilt from scratch.
+
+        Args:
+            messages: Full conversation history
+
+        Returns:
+            self
+        """
+        if not self._extends(messages):
+            self.reset()
+
+        for message in messages[self.message_count:]:
+            self.apply(message)
+        return self
+
+    def mark_demo_booked(self) -> None:
+        """Record that the book_demo tool ran for this conversation."""
+        self.demo_booked = True
+        self.demo_offered = True
+
+    def _extends(self, messages: list[Message]) -> bool:
+        """Check that messages continue the history already applied."""
+        if self.message_count == 0:
+            return True
+        if len(messages) < self.message_count:
+            return False
+        return self._fingerprint(messages[self.message_count - 1]) == self._last_fingerprint
+
+    @staticmethod
+    def _fingerprint(message: Message) -> str:
+        """Hash a message so divergence can be detected without storing the history."""
+        return hashlib.blake2b(f"{message.role}\0{message.content}".encode(), digest_size=8).hexdigest()
+
+
+class ConversationStateStore:
+    """Bounded LRU of conversation states keyed by session id."""
+
+    def __init__(self, max_sessions: int, product_names: list[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            max_sessions: Number of sessions to keep before evicting the least recently used
+            product_names: Catalog new states detect product mentions against
+        """
+        self.max_sessions = max_sessions
+        self.product_names = product_names
+        self._lock = threading.Lock()
+        self._states: OrderedDict[str, ConversationState] = OrderedDict()
+
+    def get(self, session_id: Optional[str], messages: list[Message]) -> ConversationState:
+        """
+        Get the session's state, brought up to date with the given history.
+
+        Requests without a session id get a fresh state built from the history.
+
+        Args:
+            session_id: Session identifier
+            messages: Full conversation history
+
+        Returns:
+            Up-to-date ConversationState
+        """
+        if not session_id:
+            return ConversationState(self.product_names).sync(messages)
+
+        with self._lock:
+            state = self._states.pop(session_id, None) or ConversationState(self.product_names)
+            state.sync(messages)
+            self._states[session_id] = state
+            if len(self._states) > self.max_sessions:
+                self._states.popitem(last=False)
+            return state
+
+    def get_stats(self) -> dict:
+        """Get the number of tracked sessions."""
+        with self._lock:
+            return {"sessions": len(self._states)}
+
+
+# Singleton instance
+_conversation_state_store_instance = None
+
+
+def get_conversation_state_store() -> ConversationStateStore:
+    """Get or create conversation state store singleton."""
+    global _conversation_state_store_instance
+    if _conversation_state_store_instance is None:
+        settings = get_settings()
+        _conversation_state_store_instance = ConversationStateStore(settings.conversation_state_max_sessions)
+    return _conversation_state_store_instance
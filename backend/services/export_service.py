@@ -0,0 +1,106 @@
+"""
+Export Service - Streaming Transcript Export
+Reads persisted conversations from SQLite in fixed-size keyset-paginated batches.
+"""
+
+import os
+from typing import Iterator, Optional
+from db import get_db_connection
+
+
+# Export name -> table written by the persistence service
+EXPORT_TABLES = {
+    "turns": "chat_turns",
+    "demo_bookings": "demo_bookings"
+}
+
+
+def parse_cursor(cursor: str) -> tuple[float, int]:
+    """
+    Parse a '<created_at>:<id>' cursor taken from the last exported row.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    created_at, _, row_id = cursor.rpartition(":")
+    return float(created_at), int(row_id)
+
+
+def iter_export(
+    db_path: str,
+    export: str,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    session_id: Optional[str] = None,
+    after: Optional[tuple[float, int]] = None,
+    limit: Optional[int] = None,
+    batch_size: int = 500
+) -> Iterator[dict]:
+    """
+    Stream rows ordered by (created_at, id).
+
+    Each batch is a separate short query that resumes after the last row seen
+    ("keyset" pagination), so memory stays bounded by batch_size and the
+    background writer is never blocked by a long-running read.
+
+    Args:
+        db_path: SQLite database path
+        export: Key of EXPORT_TABLES
+        since: Only rows created at or after this Unix timestamp
+        until: Only rows created before this Unix timestamp
+        session_id: Only rows for this session
+        after: (created_at, id) of the last row already exported
+        limit: Maximum rows to yield
+        batch_size: Rows fetched per query
+
+    Yields:
+        One dict per row (none if nothing has been persisted yet)
+    """
+    table = EXPORT_TABLES[export]
+    if not os.path.exists(db_path):
+        # Opening the path would create an empty database as a side effect
+        return
+
+    filters = []
+    params = []
+    if session_id is not None:
+        filters.append("session_id = ?")
+        params.append(session_id)
+    if since is not None:
+        filters.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        filters.append("created_at < ?")
+        params.append(until)
+
+    # Row-value comparison lets SQLite seek the (.., created_at, id) index directly
+    where = " AND ".join(filters + ["(created_at, id) > (?, ?)"])
+    query = f"SELECT * FROM {table} WHERE {where} ORDER BY created_at, id LIMIT ?"
+
+    position = after or (float("-inf"), -1)
+    remaining = limit
+
+    conn = get_db_connection(db_path)
+    try:
+        # The writer creates the schema on its first batch
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if exists is None:
+            return
+
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            rows = conn.execute(query, (*params, *position, size)).fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                yield dict(row)
+
+            last = rows[-1]
+            position = (last["created_at"], last["id"])
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                break
+    finally:
+        conn.close()
@@ -0,0 +1,148 @@
+"""
+Hedged Requests - Tail Latency Reduction
+Issues a backup request when the first one is slower than the recent latency percentile.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class HedgedCaller:
+    """
+    Runs a call with an optional hedge.
+
+    The primary attempt gets a deadline derived from recent successful
+    latencies. If it has not returned by then, and the hedge budget allows, an
+    identical backup attempt is started; whichever finishes first wins. The
+    loser is cancelled if it has not started yet, otherwise its result is
+    discarded (the synchronous OpenAI client cannot abort a request mid-flight).
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        min_delay: float,
+        default_delay: float,
+        max_hedge_fraction: float,
+        min_samples: int = 20,
+        window: int = 500,
+        max_workers: int = 32
+    ):
+        """
+        Initialize the hedged caller.
+
+        Args:
+            percentile: Latency percentile (0-100) used as the hedge deadline
+            min_delay: Lower bound for the hedge deadline, in seconds
+            default_delay: Deadline used until min_samples latencies are recorded
+            max_hedge_fraction: Maximum fraction of calls that may be hedged
+            min_samples: Latencies required before the percentile is trusted
+            window: Number of recent latencies to keep
+            max_workers: Thread pool size for attempts
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.max_hedge_fraction = max_hedge_fraction
+        self.min_samples = min_samples
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._closed = False
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._calls = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+
+    def get_deadline(self) -> float:
+        """Get the current hedge deadline in seconds."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay, samples[index])
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs), hedging it if it is slow.
+
+        Returns:
+            Result of the first attempt to succeed
+        """
+        if self._closed:
+            # Requests still holding a closed caller run unhedged
+            return fn(*args, **kwargs)
+
+        deadline = self.get_deadline()
+        with self._lock:
+            self._calls += 1
+
+        try:
+            primary = self._submit(fn, *args, **kwargs)
+        except RuntimeError:
+            # Closed between the check and the submit
+            return fn(*args, **kwargs)
+        done, _ = wait([primary], timeout=deadline)
+        if done or self._closed or not self._reserve_hedge():
+            return primary.result()
+
+        hedge = self._submit(fn, *args, **kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is None and pending:
+                # Give the other attempt a chance before failing the call
+                continue
+            winner = winner or next(iter(done))
+            for loser in pending:
+                loser.cancel()
+            if winner is hedge and winner.exception() is None:
+                with self._lock:
+                    self._hedge_wins += 1
+            return winner.result()
+
+    def _reserve_hedge(self) -> bool:
+        """Count a hedge if doing so stays within the budget."""
+        with self._lock:
+            if (self._hedged + 1) > self.max_hedge_fraction * self._calls:
+                return False
+            self._hedged += 1
+            return True
+
+    def _submit(self, fn, *args, **kwargs):
+        """Start an attempt and record its latency when it succeeds."""
+        started = time.monotonic()
+
+        def record(future):
+            if not future.cancelled() and future.exception() is None:
+                with self._lock:
+                    self._latencies.append(time.monotonic() - started)
+
+        # Run in a copy of the caller's context so trace spans nest under the request
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, fn, *args, **kwargs)
+        future.add_done_callback(record)
+        return future
+
+    def close(self) -> None:
+        """Release the worker threads; running attempts finish, later calls run unhedged."""
+        self._closed = True
+        self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> dict:
+        """Get hedge rate, win rate and the current deadline."""
+        deadline = self.get_deadline()
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "hedged": self._hedged,
+                "hedge_wins": self._hedge_wins,
+                "hedge_rate": self._hedged / self._calls if self._calls else 0.0,
+                "win_rate": self._hedge_wins / self._hedged if self._hedged else 0.0,
+                "deadline_ms": round(deadline * 1000, 1)
+            }
@@ -0,0 +1,232 @@
+"""
+Knowledge Base Dedup - Near-Duplicate Chunk Collapsing
+Finds near-identical chunks at ingest (webinar recaps, series parts, chunk
+overlap) with MinHash signatures over word shingles and LSH banding, and
+collapses each group into one canonical chunk that cites every source.
+"""
+
+import json
+import re
+import time
+import zlib
+import numpy as np
+from services.kb_metadata import product_flag, source_flag
+
+
+# Mersenne prime for the universal hash family; shingle hashes are reduced below it
+# so a * hash + b stays inside uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+# A chunk whose shingles almost all appear in a longer chunk is redundant even when
+# the boundaries differ enough to keep their Jaccard similarity under the threshold
+CONTAINMENT_THRESHOLD = 0.95
+
+# LSH bands are tuned for this fraction of the threshold: candidates are verified
+# exactly, so extra candidates only cost time while missed ones cost recall
+LSH_RECALL_FACTOR = 0.7
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int) -> set[int]:
+    """
+    Hash the overlapping word n-grams of a text.
+
+    Args:
+        text: Chunk text
+        size: Words per shingle
+
+    Returns:
+        Set of 32-bit shingle hashes (one shingle for texts shorter than size)
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(shingle_hashes: set[int], a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Compute the MinHash signature of one shingle set.
+
+    Args:
+        shingle_hashes: Shingle hashes from shingles()
+        a, b: Coefficients of the num_perm hash functions (a * x + b) mod p
+
+    Returns:
+        uint64 array of num_perm minimum hash values
+    """
+    hashes = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes)) % MERSENNE_PRIME
+    return ((np.outer(a, hashes) + b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+
+def lsh_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows <= num_perm whose S-curve midpoint
+    (1 / bands) ** (1 / rows) is closest to the similarity threshold.
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+def is_duplicate(first: set[int], second: set[int], threshold: float) -> bool:
+    """
+    Check two shingle sets exactly.
+
+    Returns:
+        True if their Jaccard similarity reaches the threshold, or the smaller
+        set is (almost) contained in the larger one
+    """
+    if not first or not second:
+        return first == second
+    overlap = len(first & second)
+    return (
+        overlap / len(first | second) >= threshold
+        or overlap / min(len(first), len(second)) >= CONTAINMENT_THRESHOLD
+    )
+
+
+def find_duplicate_groups(texts: list[str], threshold: float, num_perm: int, shingle_size: int, seed: int = 1) -> list[list[int]]:
+    """
+    Group near-duplicate texts.
+
+    Each text is hashed once and bucketed once per LSH band, and every bucket
+    member is verified against the bucket's first member only, so the work
+    grows linearly with the number of texts rather than with the number of pairs.
+
+    Args:
+        texts: Chunk texts in ingest order
+        threshold: Minimum shingle Jaccard similarity to count as a duplicate
+        num_perm: MinHash functions per signature
+        shingle_size: Words per shingle
+        seed: Seed for the hash coefficients (fixed so rebuilds are reproducible)
+
+    Returns:
+        Groups of two or more indices (ascending), in order of their first member
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+    bands, rows = lsh_bands(threshold * LSH_RECALL_FACTOR, num_perm)
+
+    shingle_sets = [shingles(text, shingle_size) for text in texts]
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = [dict() for _ in range(bands)]
+    for i, shingle_set in enumerate(shingle_sets):
+        signature = minhash_signature(shingle_set, a, b)
+        for band in range(bands):
+            key = signature[band * rows:(band + 1) * rows].tobytes()
+            first = buckets[band].setdefault(key, i)
+            if first != i and find(first) != find(i) and is_duplicate(shingle_sets[first], shingle_set, threshold):
+                parent[find(i)] = find(first)
+
+    groups = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted((group for group in groups.values() if len(group) > 1), key=lambda group: group[0])
+
+
+def merge_group(chunks: list[str], metadata: list[dict], group: list[int], product_names: list[str]) -> tuple[str, dict]:
+    """
+    Collapse a duplicate group into its canonical chunk.
+
+    The longest chunk (earliest on ties) is kept. Its metadata gains
+    'merged_sources' - a JSON list of every member's article, title, author,
+    date and chunk index, used for citations - and 'duplicate_count'. Product
+    flags are OR-ed across members and date_sort takes the newest member, so
+    product and date filters still match every source the text came from.
+    article_id stays the canonical chunk's; a source flag per member article
+    lets the hierarchical stage still select the chunk for any of them.
+
+    Returns:
+        (canonical_text, merged_metadata)
+    """
+    canonical = max(group, key=lambda i: (len(chunks[i]), -i))
+    members = [canonical] + [i for i in group if i != canonical]
+
+    merged = dict(metadata[canonical])
+    merged["merged_sources"] = json.dumps([
+        {
+            "article_id": metadata[i]["article_id"],
+            "chunk_index": metadata[i]["chunk_index"],
+            "title": metadata[i]["title"],
+            "author": metadata[i]["author"],
+            "date": metadata[i]["date"]
+        }
+        for i in members
+    ])
+    merged["duplicate_count"] = len(members) - 1
+    merged["date_sort"] = max(metadata[i]["date_sort"] for i in members)
+    for i in members:
+        merged[source_flag(metadata[i]["article_id"])] = True
+
+    for product in product_names:
+        flag = product_flag(product)
+        merged[flag] = any(metadata[i].get(flag, False) for i in members)
+    merged["products"] = ", ".join(product for product in product_names if merged[product_flag(product)])
+    return chunks[canonical], merged
+
+
+def dedup_chunks(
+    chunks: list[str],
+    metadata: list[dict],
+    product_names: list[str],
+    threshold: float,
+    num_perm: int,
+    shingle_size: int
+) -> tuple[list[str], list[dict], dict]:
+    """
+    Collapse near-duplicate chunks, keeping ingest order.
+
+    Args:
+        chunks: Chunk texts
+        metadata: Chunk metadata from chunk_articles()
+        product_names: Catalog the chunks were tagged with
+        threshold: Minimum shingle Jaccard similarity to merge
+        num_perm: MinHash functions per signature
+        shingle_size: Words per shingle
+
+    Returns:
+        (chunks, metadata, report) where report counts what was removed
+    """
+    started = time.monotonic()
+    groups = find_duplicate_groups(chunks, threshold, num_perm, shingle_size)
+
+    merged_at = {}
+    dropped = set()
+    for group in groups:
+        text, merged = merge_group(chunks, metadata, group, product_names)
+        merged_at[group[0]] = (text, merged)
+        dropped.update(group[1:])
+
+    kept_chunks = []
+    kept_metadata = []
+    for i, (chunk, meta) in enumerate(zip(chunks, metadata)):
+        if i in merged_at:
+            chunk, meta = merged_at[i]
+        elif i in dropped:
+            continue
+        kept_chunks.append(chunk)
+        kept_metadata.append(meta)
+
+    chars_before = sum(len(chunk) for chunk in chunks)
+    chars_after = sum(len(chunk) for chunk in kept_chunks)
+    report = {
+        "chunks_before": len(chunks),
+        "chunks_after": len(kept_chunks),
+        "groups": len(groups),
+        "removed": len(chunks) - len(kept_chunks),
+        "removed_pct": round((len(chunks) - len(kept_chunks)) / len(chunks) * 100, 1) if chunks else 0.0,
+        "chars_before": chars_before,
+        "chars_after": chars_after,
+        "threshold": threshold,
+        "seconds": round(time.monotonic() - started, 2)
+    }
+    return kept_chunks, kept_metadata, report
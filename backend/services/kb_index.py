@@ -0,0 +1,349 @@
+"""
+Knowledge Base Index - Versioned Builds and Hot Reload
+Ingest writes each build to its own directory and then atomically points a
+small manifest at it. The API loads whatever the manifest names and picks up
+new builds without a restart.
+"""
+
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+from langchain_community.vectorstores import Chroma
+from services.quantized_index import QuantizedIndex
+
+
+MANIFEST_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+QUANTIZED_INDEX_FILE = "quantized.npz"
+
+# A process serving a build leaves "<prefix><pid>.<n>" in its directory until it closes it
+OPEN_MARKER_PREFIX = ".open."
+
+
+def new_version() -> str:
+    """Get a sortable version label for a new build."""
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+def version_path(root: str, version: str) -> str:
+    """Directory holding one build."""
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def read_manifest(root: str) -> Optional[dict]:
+    """Read the manifest naming the active build, or None if there is none (legacy layout)."""
+    try:
+        with open(os.path.join(root, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(root: str, manifest: dict) -> None:
+    """
+    Point the manifest at a build.
+
+    The new manifest is written to a temporary file and renamed over the old
+    one, so readers see either the previous build or the new one, never a
+    partial file.
+    """
+    path = os.path.join(root, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def active_index_path(root: str) -> str:
+    """Directory of the build the manifest points at (the root itself for the legacy layout)."""
+    manifest = read_manifest(root)
+    return version_path(root, manifest["version"]) if manifest else root
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_open(path: str) -> bool:
+    """
+    Check whether a running process still has a build open.
+
+    Markers left behind by processes that have exited are ignored.
+    """
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return False
+    for name in names:
+        if name.startswith(OPEN_MARKER_PREFIX):
+            pid = name[len(OPEN_MARKER_PREFIX):].split(".", 1)[0]
+            if pid.isdigit() and _pid_alive(int(pid)):
+                return True
+    return False
+
+
+def prune_versions(root: str, keep: int) -> list[str]:
+    """
+    Delete all but the newest `keep` builds, never the active one or one a
+    running process has not closed yet (it is retried on the next prune).
+
+    Returns:
+        Versions that were removed
+    """
+    versions_root = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(versions_root):
+        return []
+
+    manifest = read_manifest(root)
+    active = manifest["version"] if manifest else None
+    versions = sorted(os.listdir(versions_root))
+    removed = [
+        v for v in versions[:max(len(versions) - keep, 0)]
+        if v != active and not is_open(os.path.join(versions_root, v))
+    ]
+    for version in removed:
+        shutil.rmtree(os.path.join(versions_root, version), ignore_errors=True)
+    return removed
+
+
+class KnowledgeIndex:
+    """
+    One loaded build of the knowledge base.
+
+    Searches hold a reference while they run (acquire/release). A build that
+    has been swapped out is retired and closes itself once the last search
+    using it finishes.
+    """
+
+    _marker_count = itertools.count()
+
+    def __init__(
+        self,
+        manifest: Optional[dict],
+        path: str,
+        vectorstore,
+        summary_store=None,
+        quantized_index=None,
+        question_store=None
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            manifest: Manifest this build was loaded from (None for the legacy layout)
+            path: Directory the collections were opened from
+            vectorstore: Chunk collection
+            summary_store: Article summary collection (two-stage retrieval)
+            quantized_index: Optional QuantizedIndex over the chunk embeddings
+            question_store: Synthetic question collection pointing at chunks
+        """
+        self.manifest = manifest
+        self.path = path
+        self.vectorstore = vectorstore
+        self.summary_store = summary_store
+        self.quantized_index = quantized_index
+        self.question_store = question_store
+        self.loaded_at = time.time()
+        self._lock = threading.Lock()
+        self._refs = 0
+        self._retired = False
+        self._closed = False
+        self._marker = None
+        if manifest is not None:
+            self._marker = os.path.join(path, f"{OPEN_MARKER_PREFIX}{os.getpid()}.{next(self._marker_count)}")
+            with open(self._marker, "w", encoding="utf-8"):
+                pass
+
+    @property
+    def version(self) -> str:
+        """Build version ('legacy' when no manifest exists)."""
+        return self.manifest["version"] if self.manifest else "legacy"
+
+    @classmethod
+    def load(cls, root: str, embeddings, settings) -> "KnowledgeIndex":
+        """
+        Open the build the manifest points at, or the root directory if there is no manifest.
+
+        Raises:
+            FileNotFoundError: If the manifest names a build that does not exist
+            ValueError: If the build's chunk collection is empty or its embeddings
+                have a different size than the configured embedding_dimensions
+        """
+        manifest = read_manifest(root)
+        path = version_path(root, manifest["version"]) if manifest else root
+        if manifest is not None and not os.path.isdir(path):
+            raise FileNotFoundError(f"Index build {manifest['version']} not found at {path}")
+        # Queries embedded at another size would fail (or match nothing) against this build
+        if manifest is not None and "embedding_dimensions" in manifest and \
+                manifest["embedding_dimensions"] != settings.embedding_dimensions:
+            raise ValueError(
+                f"Index build {manifest['version']} was embedded with embedding_dimensions="
+                f"{manifest['embedding_dimensions']}, but EMBEDDING_DIMENSIONS is {settings.embedding_dimensions}"
+            )
+
+        vectorstore = Chroma(
+            persist_directory=path,
+            embedding_function=embeddings,
+            collection_name="eliseai_articles"
+        )
+        if manifest is not None and not vectorstore.get(limit=1, include=[])["ids"]:
+            vectorstore._client.close()
+            raise ValueError(f"Index build {manifest['version']} has no chunks")
+
+        # Versioned builds index one summary per article (manifests before the count was
+        # recorded included); the legacy layout has no summary collection
+        summary_store = None
+        summaries = manifest.get("summaries", manifest.get("articles", 0)) if manifest is not None else 0
+        if settings.rag_hierarchical and summaries > 0:
+            summary_store = Chroma(
+                persist_directory=path,
+                embedding_function=embeddings,
+                collection_name="eliseai_article_summaries"
+            )
+
+        # Only builds that indexed questions have them; legacy and question-less builds rank chunks alone
+        question_store = None
+        if settings.rag_use_questions and manifest is not None and manifest.get("questions", 0) > 0:
+            question_store = Chroma(
+                persist_directory=path,
+                embedding_function=embeddings,
+                collection_name="eliseai_chunk_questions"
+            )
+
+        # Versioned builds carry their own quantized index; the legacy layout uses the configured path
+        if manifest is not None:
+            quantized_path = os.path.join(path, manifest["quantized_index"]) if manifest.get("quantized_index") else None
+        else:
+            quantized_path = settings.quantized_index_path
+        quantized_index = None
+        if quantized_path and os.path.exists(quantized_path):
+            quantized_index = QuantizedIndex.load(quantized_path)
+
+        return cls(manifest, path, vectorstore, summary_store, quantized_index, question_store)
+
+    def acquire(self) -> None:
+        """Register a search that is using this build."""
+        with self._lock:
+            self._refs += 1
+
+    def release(self) -> None:
+        """Finish a search; closes the build if it was retired and this was the last one."""
+        with self._lock:
+            self._refs -= 1
+            close = self._retired and self._refs == 0
+        if close:
+            self.close()
+
+    def retire(self) -> None:
+        """Close the build now if no search is using it, otherwise when the last one finishes."""
+        with self._lock:
+            self._retired = True
+            close = self._refs == 0
+        if close:
+            self.close()
+
+    def close(self) -> None:
+        """Release the Chroma clients and quantized arrays and clear this process's open marker."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for store in (self.vectorstore, self.summary_store, self.question_store):
+            if store is not None:
+                store._client.close()
+        self.quantized_index = None
+        if self._marker is not None:
+            try:
+                os.remove(self._marker)
+            except FileNotFoundError:
+                pass
+        print(f"🗑️  Knowledge base index {self.version} closed ({self.path})")
+
+    def estimate_memory(self) -> int:
+        """
+        Rough resident size of this build in bytes.
+
+        Counts the HNSW segment files Chroma maps into memory when the
+        collections are queried, plus the quantized index if loaded.
+        """
+        total = self.quantized_index.nbytes if self.quantized_index is not None else 0
+        for directory, subdirs, files in os.walk(self.path):
+            # Other builds under a legacy root are not loaded
+            subdirs[:] = [d for d in subdirs if d != VERSIONS_DIR]
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in files if name.endswith(".bin"))
+        return total
+
+    def describe(self) -> dict:
+        """Get the version and build details for status endpoints."""
+        info = {
+            "version": self.version,
+            "path": self.path,
+            "built_at": self.manifest.get("built_at") if self.manifest else None,
+            "loaded_at": self.loaded_at,
+            "quantized": self.quantized_index is not None
+        }
+        if self.manifest:
+            info.update({k: v for k, v in self.manifest.items() if k not in info})
+        return info
+
+
+class IndexWatcher:
+    """Polls for new builds in the background and asks the RAG service to swap them in."""
+
+    def __init__(self, reload_fn, interval: float):
+        """
+        Initialize and start the watcher thread.
+
+        Args:
+            reload_fn: Callable that loads and swaps in the current build if it changed
+            interval: Seconds between checks
+        """
+        self.reload_fn = reload_fn
+        self.interval = interval
+        self.checks = 0
+        self.reloads = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="index-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Polling loop."""
+        while not self._stop.wait(self.interval):
+            self.checks += 1
+            try:
+                if self.reload_fn():
+                    self.reloads += 1
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the current build; try again next interval
+                error = f"{type(e).__name__}: {e}"
+                if error != self.last_error:
+                    print(f"⚠️  Index reload failed: {error}")
+                self.last_error = error
+
+    def stop(self) -> None:
+        """Stop polling."""
+        self._stop.set()
+
+    def get_stats(self) -> dict:
+        """Get watcher counters."""
+        return {
+            "interval": self.interval,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,161 @@
+"""
+Knowledge Base Metadata - Chunk Tags and Retrieval Filters
+Shared by ingest (tagging chunks) and RAGService (building pre-filters).
+"""
+
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from prompts.product_info import get_product_names, match_products
+
+
+def product_flag(product: str) -> str:
+    """Metadata key flagging that a chunk discusses a product (Chroma has no list values)."""
+    return f"product_{product.lower()}"
+
+
+# Merged chunks flag every article their text came from (see kb_dedup.merge_group)
+SOURCE_FLAG_PREFIX = "source_"
+
+
+def source_flag(article_id: str) -> str:
+    """Metadata key flagging that a merged chunk's text also appeared in an article (Chroma has no list values)."""
+    return f"{SOURCE_FLAG_PREFIX}{article_id}"
+
+
+def parse_date(value: str) -> int:
+    """
+    Parse an article date ('January 10, 2025') or ISO date ('2025-01-10') into a sortable int.
+
+    Returns:
+        Date as YYYYMMDD, or 0 if it cannot be parsed
+    """
+    for fmt in ("%B %d, %Y", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(value.strip(), fmt).strftime("%Y%m%d"))
+        except (ValueError, AttributeError):
+            continue
+    return 0
+
+
+def tag_chunk(text: str, title: str, date: str, product_names: list[str] = None) -> dict:
+    """
+    Build the filterable metadata for one chunk.
+
+    Args:
+        text: Chunk text
+        title: Article title (product mentions in it apply to every chunk)
+        date: Article date as published
+        product_names: Catalog to tag against (defaults to PRODUCTS)
+
+    Returns:
+        Dict with 'products', one boolean flag per catalog product and 'date_sort'
+    """
+    products = match_products(f"{title}\n{text}", product_names)
+    tags = {
+        "products": ", ".join(products),
+        "date_sort": parse_date(date)
+    }
+    for product in product_names or get_product_names():
+        tags[product_flag(product)] = product in products
+    return tags
+
+
+def chunk_id(article_id: str, chunk_index: int) -> str:
+    """Stable id for a chunk, so other collections can point at it across rebuilds."""
+    return f"{article_id}:{chunk_index}"
+
+
+def filter_fields(metadata: dict) -> dict:
+    """Pick the fields build_filter() and the hierarchical stage filter on."""
+    return {
+        key: value for key, value in metadata.items()
+        if key in ("article_id", "products", "date_sort")
+        or key.startswith("product_")
+        or key.startswith(SOURCE_FLAG_PREFIX)
+    }
+
+
+def build_filter(
+    product: Optional[str] = None,
+    published_after: Optional[str] = None,
+    product_names: list[str] = None
+) -> Optional[dict]:
+    """
+    Build a Chroma `where` filter for the given restrictions.
+
+    Args:
+        product: Product name from the catalog (unknown names are ignored)
+        published_after: Earliest article date, 'YYYY-MM-DD'
+        product_names: Catalog the index was tagged with (defaults to PRODUCTS)
+
+    Returns:
+        Chroma where-dict, or None if nothing restricts the search
+    """
+    clauses = []
+    if product in (product_names or get_product_names()):
+        clauses.append({product_flag(product): True})
+    if published_after and parse_date(published_after):
+        clauses.append({"date_sort": {"$gte": parse_date(published_after)}})
+
+    return combine_filters(*clauses)
+
+
+def article_filter(article_ids: list[str], merged: bool = False) -> dict:
+    """
+    Build a filter selecting the chunks of the given articles.
+
+    Args:
+        article_ids: Articles to keep
+        merged: Also match merged chunks whose duplicates came from these
+            articles (only needed for builds that collapsed duplicates)
+    """
+    in_articles = {"article_id": {"$in": article_ids}}
+    if not merged:
+        return in_articles
+    return {"$or": [in_articles] + [{source_flag(article_id): True} for article_id in article_ids]}
+
+
+def combine_filters(*filters: Optional[dict]) -> Optional[dict]:
+    """AND together filters, skipping empty ones."""
+    clauses = [f for f in filters if f]
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def filter_mask(where: dict, columns: dict) -> np.ndarray:
+    """
+    Evaluate the subset of Chroma `where` syntax produced here against metadata columns.
+
+    Used by the quantized index, which stores metadata as one array per key.
+
+    Args:
+        where: Filter from build_filter() and article_filter() (supports $and, $or,
+            equality, $gte and $in)
+        columns: Metadata key -> array with one value per indexed chunk
+
+    Returns:
+        Boolean array selecting matching rows
+    """
+    if "$and" in where:
+        masks = [filter_mask(clause, columns) for clause in where["$and"]]
+        return np.logical_and.reduce(masks)
+    if "$or" in where:
+        masks = [filter_mask(clause, columns) for clause in where["$or"]]
+        return np.logical_or.reduce(masks)
+
+    (key, condition), = where.items()
+    if key not in columns and key.startswith(SOURCE_FLAG_PREFIX):
+        # Articles none of whose duplicates were merged have no flag column
+        return np.zeros(len(next(iter(columns.values()))), dtype=bool)
+    column = columns[key]
+    if not isinstance(condition, dict):
+        return column == condition
+    if "$gte" in condition:
+        return column >= condition["$gte"]
+    if "$in" in condition:
+        return np.isin(column, condition["$in"])
+    raise ValueError(f"Unsupported filter: {where}")
@@ -3,31 +3,64 @@ LLM Service - OpenAI Integration
 Handles all interactions with OpenAI's API including function calling.
 """
 
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
+from openai.types.chat import ChatCompletion
 import json
+import time
 from config import get_settings
-from tools.tool_definitions import get_tool_definitions
+from tools.tool_definitions import get_tool_definitions, is_terminal_tool, render_terminal_response
+from services.single_flight import SingleFlight
+from services.hedging import HedgedCaller
+from services.model_router import get_model_router
+from services.tracing import get_tracer
+from services.profiling import track_upstream
+from services.admission import get_admission_controller, call_with_backoff, OverloadedError
 
 
 class LLMService:
     """Service for interacting with OpenAI's API."""
     
-    def __init__(self, rag_service):
+    def __init__(self, rag_service, tenant=None):
         """
         Initialize the LLM service.
         
         Args:
             rag_service: RAGService instance for tool execution
+            tenant: Tenant whose brand, catalog and booking link the tools use (default: EliseAI)
         """
         self.settings = get_settings()
         self.client = OpenAI(api_key=self.settings.openai_api_key)
         self.rag_service = rag_service
-        self.tools = get_tool_definitions()
+        if tenant is not None:
+            self.tools = get_tool_definitions(tenant.company_name, tenant.product_names)
+            self.calendly_url = tenant.calendly_demo_link
+        else:
+            self.tools = get_tool_definitions()
+            self.calendly_url = None
+        
+        # Collapses identical concurrent completions into one API call
+        self.completion_flight = SingleFlight("llm_completion")
+        self.admission = get_admission_controller()
+        self.tracer = get_tracer()
+        
+        self.hedger = None
+        if self.settings.llm_hedging_enabled:
+            self.hedger = HedgedCaller(
+                percentile=self.settings.llm_hedge_percentile,
+                min_delay=self.settings.llm_hedge_min_delay,
+                default_delay=self.settings.llm_hedge_default_delay,
+                max_hedge_fraction=self.settings.llm_hedge_max_fraction
+            )
+        
+        # Fast/strong model cascade (None when routing is disabled)
+        self.router = get_model_router()
     
     def chat_completion(
         self,
         messages: list[dict],
-        use_tools: bool = True
+        use_tools: bool = True,
+        state=None,
+        on_token=None
     ) -> dict:
         """
         Get a chat completion from OpenAI, handling function calls if needed.
@@ -35,41 +68,63 @@ class LLMService:
         Args:
             messages: List of message dicts with 'role' and 'content'
             use_tools: Whether to enable function calling
+            state: Optional ConversationState, used to route the turn to a model tier
+            on_token: If given, completions are streamed and each content delta is
+                passed to it as it arrives (fast-tier answers are not escalated then,
+                since their tokens have already been sent)
         
         Returns:
             Dict with:
                 - response: Final AI response text
                 - tool_used: Name of tool if one was used
                 - tool_result: Result from tool execution
+                - tool_args: Arguments the model passed to the tool
                 - sources: List of source citations if RAG was used
+                - usage: Token counts summed over all API calls
+                - model_tier: Tier that produced the answer (when routing is enabled)
         """
         # Prepare messages
         conversation = messages.copy()
         
+        # Pick the model tier for this turn
+        tier = None
+        model = self.settings.llm_model
+        max_tokens = self.settings.max_tokens
+        if self.router is not None:
+            tier, reason = self.router.route(messages, state)
+            model, max_tokens = tier.model, tier.max_tokens
+            span = self.tracer.current_span()
+            if span is not None:
+                span.set_attribute("model_tier", tier.name)
+                span.set_attribute("routing_reason", reason)
+        
         # Make initial API call
         completion_kwargs = {
-            "model": self.settings.llm_model,
+            "model": model,
             "messages": conversation,
             "temperature": self.settings.llm_temperature,
-            "max_tokens": self.settings.max_tokens
+            "max_tokens": max_tokens
         }
         
         if use_tools:
             completion_kwargs["tools"] = self.tools
             completion_kwargs["tool_choice"] = "auto"
         
-        response = self.client.chat.completions.create(**completion_kwargs)
-        
-        response_message = response.choices[0].message
-        tool_calls = response_message.tool_calls
-        
         result = {
             "response": None,
             "tool_used": None,
             "tool_result": None,
-            "sources": []
+            "tool_args": None,
+            "sources": [],
+            "usage": self._empty_usage(),
+            "model_tier": tier.name if tier else None
         }
         
+        response, tier = self._routed_completion(tier, result, on_token, **completion_kwargs)
+        
+        response_message = response.choices[0].message
+        tool_calls = response_message.tool_calls
+        
         # If no tool calls, return the response directly
         if not tool_calls:
             result["response"] = response_message.content
@@ -83,10 +138,12 @@ class LLMService:
             function_args = json.loads(tool_call.function.arguments)
             
             result["tool_used"] = function_name
+            result["tool_args"] = function_args
             
             # Execute the appropriate tool
             if function_name == "search_knowledge_base":
-                tool_response = self._execute_search_kb(function_args)
+                with self.tracer.span("tool.search_knowledge_base"):
+                    tool_response = self._execute_search_kb(function_args)
                 result["tool_result"] = tool_response
                 result["sources"] = tool_response.get("citations", [])
                 
@@ -99,7 +156,8 @@ class LLMService:
                 })
             
             elif function_name == "book_demo":
-                tool_response = self._execute_book_demo(function_args)
+                with self.tracer.span("tool.book_demo"):
+                    tool_response = self._execute_book_demo(function_args)
                 result["tool_result"] = tool_response
                 
                 # Add tool response to conversation
@@ -110,28 +168,262 @@ class LLMService:
                     "content": json.dumps(tool_response)
                 })
         
+        # Deterministic tools (e.g. book_demo) don't need the model to phrase their result
+        if self.settings.llm_short_circuit_terminal_tools and all(
+            is_terminal_tool(tool_call.function.name) for tool_call in tool_calls
+        ):
+            result["response"] = render_terminal_response(
+                result["tool_used"],
+                result["tool_result"],
+                response_message.content
+            )
+            return result
+        
         # Get final response after tool execution
-        final_response = self.client.chat.completions.create(
-            model=self.settings.llm_model,
-            messages=conversation,
-            temperature=self.settings.llm_temperature,
-            max_tokens=self.settings.max_tokens
-        )
+        final_kwargs = {
+            "model": tier.model if tier else self.settings.llm_model,
+            "messages": conversation,
+            "temperature": self.settings.llm_temperature,
+            "max_tokens": tier.max_tokens if tier else self.settings.max_tokens
+        }
+        final_response, tier = self._routed_completion(tier, result, on_token, **final_kwargs)
         
         result["response"] = final_response.choices[0].message.content
         
         return result
     
+    @staticmethod
+    def _empty_usage() -> dict:
+        """Get a zeroed token usage dict."""
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    
+    @staticmethod
+    def _add_usage(usage: dict, response) -> None:
+        """Add a completion's token usage to a running total."""
+        if response.usage is None:
+            return
+        usage["prompt_tokens"] += response.usage.prompt_tokens
+        usage["completion_tokens"] += response.usage.completion_tokens
+        usage["total_tokens"] += response.usage.total_tokens
+    
+    def _routed_completion(self, tier, result: dict, on_token=None, **kwargs):
+        """
+        Create a completion on the given tier, escalating a failed fast-tier
+        answer to the strong tier. Usage and the final tier are recorded in result.
+        
+        Args:
+            tier: ModelTier to use, or None when routing is disabled
+            result: chat_completion result dict being built
+            on_token: Stream the completion to this callback
+            **kwargs: Arguments for client.chat.completions.create
+        
+        Returns:
+            (response, tier) tuple - tier is the one that produced the response
+        """
+        def complete():
+            if on_token is not None:
+                return self._stream_completion(on_token, **kwargs)
+            return self._create_completion(**kwargs)
+        
+        if tier is None:
+            response = complete()
+            self._add_usage(result["usage"], response)
+            return response, None
+        
+        started = time.monotonic()
+        response = complete()
+        self.router.record(tier, time.monotonic() - started, response)
+        self._add_usage(result["usage"], response)
+        
+        # Redo fast-tier answers that look truncated, empty or unsure on the strong tier
+        if on_token is None and tier.name == "fast" and self.router.needs_escalation(response):
+            self.router.record_escalation()
+            tier = self.router.tiers["strong"]
+            kwargs.update(model=tier.model, max_tokens=tier.max_tokens)
+            
+            started = time.monotonic()
+            response = self._create_completion(**kwargs)
+            self.router.record(tier, time.monotonic() - started, response)
+            self._add_usage(result["usage"], response)
+        
+        result["model_tier"] = tier.name
+        return response, tier
+    
+    def _create_completion(self, **kwargs):
+        """
+        Create a chat completion, coalescing identical concurrent requests
+        and hedging slow ones when enabled.
+        
+        Args:
+            **kwargs: Arguments for client.chat.completions.create
+        
+        Returns:
+            OpenAI ChatCompletion response
+        """
+        with self.tracer.span("llm.completion", model=kwargs["model"], tool_round="tools" not in kwargs) as span:
+            key = self._completion_key(kwargs)
+            if self.hedger is not None:
+                response = self.completion_flight.do(key, self.hedger.call, self._call_upstream, self._request, **kwargs)
+            else:
+                response = self.completion_flight.do(key, self._call_upstream, self._request, **kwargs)
+            
+            if span is not None and response.usage is not None:
+                span.set_attribute("prompt_tokens", response.usage.prompt_tokens)
+                span.set_attribute("completion_tokens", response.usage.completion_tokens)
+            return response
+    
+    def _stream_completion(self, on_token, **kwargs):
+        """
+        Stream a chat completion, passing content deltas to on_token.
+        
+        Streams are not coalesced or hedged - every caller needs its own tokens.
+        
+        Args:
+            on_token: Callback for each content delta
+            **kwargs: Arguments for client.chat.completions.create
+        
+        Returns:
+            ChatCompletion assembled from the streamed chunks
+        """
+        with self.tracer.span("llm.completion", model=kwargs["model"], tool_round="tools" not in kwargs, stream=True) as span:
+            response = self._call_upstream(lambda **kw: self._stream_request(on_token, **kw), **kwargs)
+            
+            if span is not None and response.usage is not None:
+                span.set_attribute("prompt_tokens", response.usage.prompt_tokens)
+                span.set_attribute("completion_tokens", response.usage.completion_tokens)
+            return response
+    
+    def _call_upstream(self, request_fn, **kwargs):
+        """
+        Call the OpenAI API under admission control, retrying rate limits.
+        
+        Args:
+            request_fn: Function making one request (_request or a streaming request)
+            **kwargs: Arguments for client.chat.completions.create
+        
+        Raises:
+            OverloadedError: If no slot is available or rate limits persist after retries
+        """
+        try:
+            return call_with_backoff(
+                lambda: self.admission.call(request_fn, **kwargs),
+                retry_on=(RateLimitError,),
+                max_retries=self.settings.upstream_max_retries,
+                base_delay=self.settings.upstream_retry_base_delay,
+                max_delay=self.settings.upstream_retry_max_delay
+            )
+        except RateLimitError as e:
+            raise OverloadedError("OpenAI rate limit persisted after retries") from e
+    
+    def _request(self, **kwargs):
+        """Make one OpenAI request (one attempt, one span)."""
+        with self.tracer.span("openai.chat.completions"), track_upstream():
+            return self.client.chat.completions.create(**kwargs)
+    
+    def _stream_request(self, on_token, **kwargs):
+        """Make one streaming OpenAI request and assemble its chunks into a ChatCompletion."""
+        content = []
+        tool_calls = {}
+        finish_reason = None
+        usage = None
+        first = None
+        
+        with self.tracer.span("openai.chat.completions", stream=True), track_upstream():
+            stream = self.client.chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **kwargs
+            )
+            try:
+                for chunk in stream:
+                    first = first or chunk
+                    if chunk.usage is not None:
+                        usage = chunk.usage.model_dump()
+                    if not chunk.choices:
+                        continue
+                    
+                    choice = chunk.choices[0]
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+                    if choice.delta.content:
+                        content.append(choice.delta.content)
+                        on_token(choice.delta.content)
+                    
+                    # Tool call names and arguments arrive in fragments keyed by index
+                    for fragment in choice.delta.tool_calls or []:
+                        call = tool_calls.setdefault(fragment.index, {
+                            "id": None,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        })
+                        if fragment.id:
+                            call["id"] = fragment.id
+                        if fragment.function is not None:
+                            call["function"]["name"] += fragment.function.name or ""
+                            call["function"]["arguments"] += fragment.function.arguments or ""
+            finally:
+                # Closes the HTTP response when on_token aborts the turn mid-stream
+                stream.close()
+        
+        return ChatCompletion.model_validate({
+            "id": first.id,
+            "object": "chat.completion",
+            "created": first.created,
+            "model": first.model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": finish_reason or "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": "".join(content) or None,
+                    "tool_calls": [tool_calls[index] for index in sorted(tool_calls)] or None
+                }
+            }],
+            "usage": usage
+        })
+    
+    @staticmethod
+    def _completion_key(kwargs: dict) -> str:
+        """Build a stable key for a completion request from its arguments."""
+        def normalize(value):
+            # SDK message objects (assistant tool-call turns) serialize via model_dump
+            if hasattr(value, "model_dump"):
+                return value.model_dump(exclude_none=True)
+            return str(value)
+        
+        return json.dumps(kwargs, sort_keys=True, default=normalize)
+    
+    def close(self) -> None:
+        """Shut down the hedging thread pool (the service stays usable, unhedged)."""
+        if self.hedger is not None:
+            self.hedger.close()
+    
+    def get_stats(self) -> dict:
+        """Get LLM service counters."""
+        stats = {
+            "coalescing": self.completion_flight.get_stats()
+        }
+        if self.hedger is not None:
+            stats["hedging"] = self.hedger.get_stats()
+        if self.router is not None:
+            stats["routing"] = self.router.get_stats()
+        return stats
+    
     def _execute_search_kb(self, args: dict) -> dict:
         """Execute the search_knowledge_base tool."""
         from tools.tool_definitions import execute_search_knowledge_base
         query = args.get("query", "")
-        return execute_search_knowledge_base(query, self.rag_service)
+        return execute_search_knowledge_base(
+            query,
+            self.rag_service,
+            product=args.get("product"),
+            published_after=args.get("published_after")
+        )
     
     def _execute_book_demo(self, args: dict) -> dict:
         """Execute the book_demo tool."""
         from tools.tool_definitions import execute_book_demo
-        return execute_book_demo(**args)
+        return execute_book_demo(calendly_url=self.calendly_url, **args)
 
 
 # Singleton instance
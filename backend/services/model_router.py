@@ -0,0 +1,187 @@
+"""
+Model Router - Fast/Strong Model Cascade
+Picks a model tier per turn from cheap local signals and escalates
+fast-tier answers that fail basic checks.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Optional
+from config import get_settings
+from prompts.product_info import match_products
+
+
+# Intents that usually need the stronger model (detailed, numeric or comparative answers)
+COMPLEX_INTENT_PATTERN = re.compile(
+    r"\b(roi|pricing|price|cost|integrat\w*|compar\w*|vs\.?|versus|case stud\w*|implement\w*|"
+    r"security|complian\w*|contract|migrat\w*|how does|why)\b",
+    re.IGNORECASE
+)
+
+# Phrases suggesting the fast model could not answer
+UNCERTAIN_PATTERN = re.compile(
+    r"\b(i'?m not sure|i don'?t know|i do not know|i can'?t help|i cannot help|unable to)\b",
+    re.IGNORECASE
+)
+
+
+class ModelTier:
+    """A model configuration the router can choose."""
+
+    def __init__(self, name: str, model: str, max_tokens: int, input_cost_per_1k: float, output_cost_per_1k: float):
+        """
+        Initialize the tier.
+
+        Args:
+            name: Tier label ('fast' or 'strong')
+            model: OpenAI model name
+            max_tokens: Completion token limit
+            input_cost_per_1k: USD per 1K prompt tokens
+            output_cost_per_1k: USD per 1K completion tokens
+        """
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.input_cost_per_1k = input_cost_per_1k
+        self.output_cost_per_1k = output_cost_per_1k
+
+
+class ModelRouter:
+    """Routes turns between a fast and a strong model tier."""
+
+    def __init__(self, settings):
+        """
+        Initialize the router from settings.
+
+        Args:
+            settings: Application settings
+        """
+        self.long_message_chars = settings.routing_long_message_chars
+        self.tiers = {
+            "fast": ModelTier(
+                "fast",
+                settings.llm_fast_model,
+                settings.llm_fast_max_tokens,
+                settings.llm_fast_cost_per_1k_input,
+                settings.llm_fast_cost_per_1k_output
+            ),
+            "strong": ModelTier(
+                "strong",
+                settings.llm_model,
+                settings.max_tokens,
+                settings.llm_cost_per_1k_input,
+                settings.llm_cost_per_1k_output
+            )
+        }
+
+        self._lock = threading.Lock()
+        self._stats = {
+            name: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "latencies": deque(maxlen=500)}
+            for name in self.tiers
+        }
+        self._routed = {name: 0 for name in self.tiers}
+        self._escalations = 0
+
+    def route(self, messages: list[dict], state=None) -> tuple[ModelTier, str]:
+        """
+        Pick a tier for this turn.
+
+        Args:
+            messages: LLM messages (system prompt + history)
+            state: Optional ConversationState for the session
+
+        Returns:
+            (tier, reason) tuple
+        """
+        last_user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "") or ""
+
+        if len(last_user) > self.long_message_chars:
+            reason = "long_message"
+        elif COMPLEX_INTENT_PATTERN.search(last_user):
+            reason = "complex_intent"
+        elif match_products(last_user, state.product_names if state is not None else None) and "?" in last_user:
+            # Product questions usually trigger retrieval and a grounded answer
+            reason = "retrieval_likely"
+        elif state is not None and state.stage == "educate" and "?" in last_user:
+            reason = "retrieval_likely"
+        else:
+            reason = "simple_turn"
+
+        tier = self.tiers["fast"] if reason == "simple_turn" else self.tiers["strong"]
+        with self._lock:
+            self._routed[tier.name] += 1
+        return tier, reason
+
+    def needs_escalation(self, response) -> bool:
+        """
+        Check a fast-tier completion for signs it should be redone on the strong tier.
+
+        Short answers are fine - greetings and thanks are what the fast tier is for.
+
+        Args:
+            response: OpenAI ChatCompletion
+
+        Returns:
+            True if the answer is truncated, empty or uncertain
+        """
+        choice = response.choices[0]
+        if choice.message.tool_calls:
+            return False
+        if choice.finish_reason == "length":
+            return True
+
+        content = (choice.message.content or "").strip()
+        return not content or bool(UNCERTAIN_PATTERN.search(content))
+
+    def record(self, tier: ModelTier, latency: float, response) -> None:
+        """Record latency, tokens and estimated cost for one completion."""
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats["calls"] += 1
+            stats["latencies"].append(latency)
+            if response.usage is not None:
+                stats["prompt_tokens"] += response.usage.prompt_tokens
+                stats["completion_tokens"] += response.usage.completion_tokens
+                stats["cost_usd"] += (
+                    response.usage.prompt_tokens / 1000 * tier.input_cost_per_1k
+                    + response.usage.completion_tokens / 1000 * tier.output_cost_per_1k
+                )
+
+    def record_escalation(self) -> None:
+        """Count a fast-tier answer that was redone on the strong tier."""
+        with self._lock:
+            self._escalations += 1
+
+    def get_stats(self) -> dict:
+        """Get per-tier routing, latency and cost figures."""
+        with self._lock:
+            tiers = {}
+            for name, stats in self._stats.items():
+                latencies = sorted(stats["latencies"])
+                tiers[name] = {
+                    "model": self.tiers[name].model,
+                    "routed_turns": self._routed[name],
+                    "completions": stats["calls"],
+                    "latency_ms_mean": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+                    "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else None,
+                    "prompt_tokens": stats["prompt_tokens"],
+                    "completion_tokens": stats["completion_tokens"],
+                    "cost_usd": round(stats["cost_usd"], 6)
+                }
+            return {"tiers": tiers, "escalations": self._escalations}
+
+
+# Singleton instance
+_model_router_instance = None
+
+
+def get_model_router() -> Optional[ModelRouter]:
+    """Get or create the model router singleton (None when routing is disabled)."""
+    global _model_router_instance
+    settings = get_settings()
+    if not settings.model_routing_enabled:
+        return None
+    if _model_router_instance is None:
+        _model_router_instance = ModelRouter(settings)
+    return _model_router_instance
@@ -0,0 +1,178 @@
+"""
+Persistence Service - Write-Behind Conversation Log
+Queues chat turns and demo bookings in memory and writes them to SQLite
+from a background thread in batched transactions.
+"""
+
+import queue
+import threading
+import time
+from typing import Optional
+from config import get_settings
+from db import get_db_connection, init_schema
+
+
+INSERT_TURN = """
+INSERT INTO chat_turns (
+  session_id, created_at, user_message, assistant_response, tool_used,
+  latency_ms, prompt_tokens, completion_tokens, degraded
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_DEMO_BOOKING = """
+INSERT INTO demo_bookings (session_id, created_at, reason, calendly_url)
+VALUES (?, ?, ?, ?)
+"""
+
+
+class PersistenceService:
+    """
+    Write-behind logger for conversations.
+
+    record_*() methods only put a row on a bounded queue and never block the
+    request path; if the queue is full the row is dropped and counted.
+    """
+
+    def __init__(self, db_path: str, queue_size: int, batch_size: int, flush_interval: float):
+        """
+        Initialize the service and start the writer thread.
+
+        Args:
+            db_path: SQLite database path
+            queue_size: Maximum rows waiting to be written
+            batch_size: Maximum rows written per transaction
+            flush_interval: Seconds to wait for more rows before writing a partial batch
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+        self._writer = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._writer.start()
+
+    def record_turn(
+        self,
+        session_id: Optional[str],
+        user_message: Optional[str],
+        assistant_response: str,
+        tool_used: Optional[str],
+        latency_ms: float,
+        usage: Optional[dict] = None,
+        degraded: bool = False
+    ) -> None:
+        """Queue one chat turn (user message, reply, tool and timing)."""
+        usage = usage or {}
+        self._enqueue(INSERT_TURN, (
+            session_id,
+            time.time(),
+            user_message,
+            assistant_response,
+            tool_used,
+            latency_ms,
+            usage.get("prompt_tokens"),
+            usage.get("completion_tokens"),
+            int(degraded)
+        ))
+
+    def record_demo_booking(self, session_id: Optional[str], reason: Optional[str], calendly_url: Optional[str]) -> None:
+        """Queue a book_demo conversion event."""
+        self._enqueue(INSERT_DEMO_BOOKING, (session_id, time.time(), reason, calendly_url))
+
+    def _enqueue(self, statement: str, row: tuple) -> None:
+        """Put a row on the queue without blocking."""
+        try:
+            self._queue.put_nowait((statement, row))
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        with self._lock:
+            self._stats["enqueued"] += 1
+
+    def _run(self) -> None:
+        """Writer loop: collect rows into batches and write each batch in one transaction."""
+        conn = None
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            try:
+                if conn is None:
+                    conn = get_db_connection(self.db_path)
+                    init_schema(conn)
+                self._write_batch(conn, batch)
+            except Exception as e:
+                print(f"⚠️  Persistence write failed, dropping {len(batch)} rows: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._stats["dropped"] += len(batch)
+                if conn is not None:
+                    conn.close()
+                    conn = None
+
+        if conn is not None:
+            conn.close()
+
+    def _next_batch(self) -> list[tuple]:
+        """Wait for the first row, then drain up to batch_size rows."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, conn, batch: list[tuple]) -> None:
+        """Write a batch grouped by statement so each group uses one prepared executemany."""
+        grouped: dict[str, list[tuple]] = {}
+        for statement, row in batch:
+            grouped.setdefault(statement, []).append(row)
+
+        with conn:
+            for statement, rows in grouped.items():
+                conn.executemany(statement, rows)
+
+        with self._lock:
+            self._stats["written"] += len(batch)
+            self._stats["batches"] += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued rows and stop the writer thread."""
+        self._stop.set()
+        self._writer.join(timeout=timeout)
+
+    def get_stats(self) -> dict:
+        """Get queue depth and write counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+
+# Singleton instance
+_persistence_service_instance = None
+
+
+def get_persistence_service() -> PersistenceService:
+    """Get or create persistence service singleton."""
+    global _persistence_service_instance
+    if _persistence_service_instance is None:
+        settings = get_settings()
+        _persistence_service_instance = PersistenceService(
+            db_path=settings.database_url,
+            queue_size=settings.persistence_queue_size,
+            batch_size=settings.persistence_batch_size,
+            flush_interval=settings.persistence_flush_interval
+        )
+    return _persistence_service_instance
@@ -0,0 +1,173 @@
+"""
+Profiling - On-Demand Request Profiles
+Samples the stack of a single request's thread and writes a
+flamegraph-compatible (collapsed stacks) profile plus a timing summary.
+"""
+
+import contextvars
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+from config import get_settings
+
+
+_active_profile: contextvars.ContextVar = contextvars.ContextVar("active_profile", default=None)
+
+
+class SamplingProfiler:
+    """Periodically captures the call stack of one thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        """
+        Initialize the profiler.
+
+        Args:
+            thread_id: Ident of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self) -> None:
+        """Sampling loop."""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_folded(self, path: str) -> None:
+        """Write collapsed stacks ('frame;frame;frame count'), readable by flamegraph.pl and speedscope."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfile:
+    """Timing collected while one request is being profiled."""
+
+    def __init__(self):
+        """Initialize counters."""
+        self.upstream_wait = 0.0
+        self.upstream_calls = 0
+
+
+# Returned on the hot path when nothing is being profiled (nullcontext is reusable)
+_NOT_TRACKED = nullcontext()
+
+
+def track_upstream():
+    """
+    Attribute the enclosed wall time to waiting on OpenAI, if a profile is active.
+
+    Returns:
+        Context manager - a shared no-op unless this request is being profiled
+    """
+    if not get_settings().profiling_enabled:
+        return _NOT_TRACKED
+    profile = _active_profile.get()
+    if profile is None:
+        return _NOT_TRACKED
+    return _track_upstream(profile)
+
+
+@contextmanager
+def _track_upstream(profile):
+    """Add the enclosed wall time to the profile's upstream wait."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.upstream_wait += time.perf_counter() - started
+        profile.upstream_calls += 1
+
+
+@contextmanager
+def _profile(name: str, response, settings):
+    """Profile the enclosed block and write its profile files."""
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{secrets.token_hex(3)}"
+    os.makedirs(settings.profiling_output_dir, exist_ok=True)
+    base_path = os.path.join(settings.profiling_output_dir, profile_id)
+
+    profile = RequestProfile()
+    token = _active_profile.set(profile)
+    sampler = SamplingProfiler(threading.get_ident(), settings.profiling_sample_interval)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    sampler.start()
+    try:
+        yield profile
+    finally:
+        sampler.stop()
+        cpu = time.thread_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        _active_profile.reset(token)
+
+        sampler.write_folded(f"{base_path}.folded")
+        summary = {
+            "profile_id": profile_id,
+            "endpoint": name,
+            "wall_ms": round(wall * 1000, 1),
+            "cpu_ms": round(cpu * 1000, 1),
+            "upstream_wait_ms": round(profile.upstream_wait * 1000, 1),
+            "upstream_calls": profile.upstream_calls,
+            "samples": sampler.samples,
+            "sample_interval_ms": settings.profiling_sample_interval * 1000
+        }
+        with open(f"{base_path}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+        print(f"🔬 Profiled {name}: wall {summary['wall_ms']}ms, cpu {summary['cpu_ms']}ms, "
+              f"OpenAI wait {summary['upstream_wait_ms']}ms -> {base_path}.folded")
+        response.headers["X-Profile-Id"] = profile_id
+
+
+def maybe_profile(name: str, token: Optional[str], response):
+    """
+    Profile a request if profiling is enabled and the token matches the admin key.
+
+    Args:
+        name: Endpoint label used in file names
+        token: Value of the X-Profile-Token header
+        response: FastAPI Response, used to return the profile id
+
+    Returns:
+        Context manager - a no-op unless the request is authorized for profiling
+    """
+    if token is None:
+        return nullcontext()
+
+    settings = get_settings()
+    if not (settings.profiling_enabled and settings.admin_api_key
+            and secrets.compare_digest(token, settings.admin_api_key)):
+        return nullcontext()
+
+    return _profile(name, response, settings)
@@ -0,0 +1,237 @@
+"""
+Quantized Index - Compact Embedding Storage and Search
+Stores dimension-reduced int8/float16 copies of the chunk embeddings in a
+single .npz file and scores queries against them directly.
+"""
+
+from typing import Optional
+import numpy as np
+from services.kb_metadata import SOURCE_FLAG_PREFIX
+
+
+# Rows scored per block, bounding the temporary float32 copy made during search
+SCORE_BLOCK_ROWS = 65536
+
+
+def reduce_dimensions(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Truncate embeddings to their first `dimensions` components and re-normalize.
+
+    text-embedding-3 models are trained so that a truncated, re-normalized
+    prefix is equivalent to requesting fewer dimensions from the API.
+
+    Args:
+        vectors: Array of shape (n, d) or (d,)
+        dimensions: Target dimensionality (<= d)
+
+    Returns:
+        Unit-length float32 vectors of the reduced size
+    """
+    reduced = np.asarray(vectors, dtype=np.float32)[..., :dimensions]
+    norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+    return reduced / np.maximum(norms, 1e-12)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize unit-length vectors.
+
+    int8 uses a per-vector symmetric scale (value = code * scale); float16 is
+    stored as-is with unit scales.
+
+    Args:
+        vectors: float32 array of shape (n, d)
+        dtype: 'int8' or 'float16'
+
+    Returns:
+        (codes, scales) tuple
+    """
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    if dtype != "int8":
+        raise ValueError(f"Unsupported quantization dtype: {dtype}")
+
+    max_abs = np.maximum(np.abs(vectors).max(axis=1), 1e-12)
+    scales = (max_abs / 127.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+# String metadata kept as filter columns (other text stays in Chroma)
+STRING_FILTER_KEYS = ("article_id",)
+
+
+def filter_columns(metadatas: list[dict]) -> dict:
+    """
+    Turn per-chunk metadata into columns for pre-filtering.
+
+    Keys present in every row with bool or int values (product flags,
+    date_sort) are kept, plus the ids in STRING_FILTER_KEYS and the source
+    flags of merged chunks (False on the rows that lack them).
+
+    Returns:
+        Key -> array with one value per chunk
+    """
+    if not metadatas:
+        return {}
+
+    columns = {}
+    for key in metadatas[0]:
+        values = [metadata.get(key) for metadata in metadatas]
+        if all(isinstance(value, bool) for value in values):
+            columns[key] = np.asarray(values, dtype=bool)
+        elif all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            columns[key] = np.asarray(values, dtype=np.int64)
+        elif key in STRING_FILTER_KEYS and all(isinstance(value, str) for value in values):
+            columns[key] = np.asarray(values)
+
+    source_flags = {key for metadata in metadatas for key in metadata if key.startswith(SOURCE_FLAG_PREFIX)}
+    for key in sorted(source_flags):
+        columns[key] = np.asarray([metadata.get(key, False) for metadata in metadatas], dtype=bool)
+    return columns
+
+
+class QuantizedIndex:
+    """Brute-force inner-product search over quantized embeddings."""
+
+    def __init__(self, ids: np.ndarray, codes: np.ndarray, scales: np.ndarray, columns: dict = None):
+        """
+        Initialize the index.
+
+        Args:
+            ids: Chunk ids (matching the Chroma collection)
+            codes: Quantized vectors of shape (n, d)
+            scales: Per-vector dequantization scales
+            columns: Filterable metadata, key -> array with one value per chunk
+        """
+        self.ids = ids
+        self.codes = codes
+        self.scales = scales
+        self.columns = columns or {}
+        self.dimensions = codes.shape[1]
+        self.dtype = str(codes.dtype)
+
+    @classmethod
+    def build(
+        cls,
+        ids: list[str],
+        vectors: np.ndarray,
+        dtype: str = "int8",
+        dimensions: int = None,
+        metadatas: list[dict] = None
+    ) -> "QuantizedIndex":
+        """
+        Build an index from full-precision embeddings.
+
+        Args:
+            ids: Chunk ids
+            vectors: float32 array of shape (n, d)
+            dtype: 'int8' or 'float16'
+            dimensions: Optional reduced dimensionality
+            metadatas: Optional chunk metadata; bool/int fields become filter columns
+
+        Returns:
+            QuantizedIndex
+        """
+        vectors = reduce_dimensions(vectors, dimensions or vectors.shape[1])
+        codes, scales = quantize(vectors, dtype)
+        return cls(np.asarray(ids), codes, scales, filter_columns(metadatas or []))
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedIndex":
+        """Load an index saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            columns = {
+                name[len("meta_"):]: data[name]
+                for name in data.files if name.startswith("meta_")
+            }
+            return cls(data["ids"], data["codes"], data["scales"], columns)
+
+    def save(self, path: str) -> None:
+        """Write the index to a compressed .npz file."""
+        columns = {f"meta_{key}": values for key, values in self.columns.items()}
+        np.savez_compressed(path, ids=self.ids, codes=self.codes, scales=self.scales, **columns)
+
+    @property
+    def nbytes(self) -> int:
+        """In-memory size of the vectors, scales and filter columns."""
+        return self.codes.nbytes + self.scales.nbytes + sum(c.nbytes for c in self.columns.values())
+
+    def search(self, query: np.ndarray, top_k: int, mask: np.ndarray = None) -> list[tuple[str, float]]:
+        """
+        Score the query against every stored vector.
+
+        Args:
+            query: Query embedding (any dimensionality >= the index's)
+            top_k: Number of results to return
+            mask: Optional boolean array restricting the candidate rows
+
+        Returns:
+            List of (id, approximate cosine score), best first
+        """
+        query = reduce_dimensions(query, self.dimensions)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+
+        for start in range(0, len(self.codes), SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+
+        scores *= self.scales
+        if mask is not None:
+            scores[~mask] = -np.inf
+
+        top_k = min(top_k, int(np.isfinite(scores).sum()))
+        if top_k <= 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        return [(str(self.ids[i]), float(scores[i])) for i in top]
+
+
+def evaluate_recall(
+    index: QuantizedIndex,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    rescore_factor: int = 0,
+    query_rows: Optional[list[int]] = None
+) -> float:
+    """
+    Measure recall@k of the quantized index against exact full-precision search.
+
+    When queries are taken from the indexed vectors, pass their rows as
+    query_rows: each query's own row is its trivial top-1 in both searches
+    and would inflate recall, so it is left out of both result lists.
+
+    Args:
+        index: Quantized index built from `vectors`
+        vectors: Full-precision embeddings in index order
+        queries: Query embeddings
+        k: Number of neighbours compared
+        rescore_factor: If > 0, rescore k * rescore_factor candidates at full precision
+        query_rows: Row of `vectors` each query was taken from, if any
+
+    Returns:
+        Mean fraction of exact top-k neighbours also returned by the index
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    position = {str(chunk_id): i for i, chunk_id in enumerate(index.ids)}
+    hits = 0
+
+    for i, query in enumerate(np.asarray(queries, dtype=np.float32)):
+        own_row = query_rows[i] if query_rows is not None else None
+        scores = vectors @ query
+        if own_row is not None:
+            scores[own_row] = -np.inf
+        exact = set(np.argsort(-scores)[:k].tolist())
+
+        num_candidates = (k * rescore_factor if rescore_factor else k) + (own_row is not None)
+        candidates = index.search(query, num_candidates)
+        rows = [position[chunk_id] for chunk_id, _ in candidates if position[chunk_id] != own_row]
+        if rescore_factor:
+            rows = sorted(rows, key=lambda row: -float(vectors[row] @ query))
+        rows = rows[:k]
+
+        hits += len(exact.intersection(rows))
+
+    return hits / (k * len(queries)) if len(queries) else 1.0
@@ -0,0 +1,125 @@
+"""
+Question Generation - Synthetic Queries for Chunks
+Generates likely user questions for each knowledge base chunk at ingest.
+The questions are embedded as extra pointers to their parent chunk, so
+conversational phrasing can match article prose.
+"""
+
+import importlib
+import json
+import re
+from abc import ABC, abstractmethod
+from openai import OpenAI
+from prompts.question_generation import get_question_generation_prompt
+
+
+HEADING_PATTERN = re.compile(r"^#{2,6}\s+(.+)$", re.MULTILINE)
+
+
+class QuestionGenerator(ABC):
+    """
+    Base class for question generators.
+
+    Custom generators subclass this, take the settings in their constructor
+    and are selected with question_generator='package.module:ClassName'.
+    """
+
+    def __init__(self, settings):
+        """
+        Initialize the generator.
+
+        Args:
+            settings: Application settings
+        """
+        self.settings = settings
+
+    @abstractmethod
+    def generate(self, text: str, metadata: dict, count: int) -> list[str]:
+        """
+        Generate questions the chunk answers.
+
+        Args:
+            text: Chunk text
+            metadata: Chunk metadata (title, products, ...)
+            count: Maximum number of questions
+
+        Returns:
+            Up to count questions
+        """
+
+
+class OpenAIQuestionGenerator(QuestionGenerator):
+    """Asks an OpenAI chat model for questions in the prospect's own words."""
+
+    def __init__(self, settings):
+        """Initialize the OpenAI client."""
+        super().__init__(settings)
+        self.client = OpenAI(api_key=settings.openai_api_key)
+
+    def generate(self, text: str, metadata: dict, count: int) -> list[str]:
+        """Generate questions with one JSON-mode completion."""
+        response = self.client.chat.completions.create(
+            model=self.settings.question_generation_model,
+            temperature=0.3,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": get_question_generation_prompt(count)},
+                {"role": "user", "content": f"Article: {metadata.get('title', 'Untitled')}\n\n{text}"}
+            ]
+        )
+
+        try:
+            questions = json.loads(response.choices[0].message.content).get("questions", [])
+        except (ValueError, AttributeError):
+            return []
+        return [q.strip() for q in questions if isinstance(q, str) and q.strip()][:count]
+
+
+class HeuristicQuestionGenerator(QuestionGenerator):
+    """Offline stand-in: templated questions from the chunk's headings, products and title."""
+
+    def generate(self, text: str, metadata: dict, count: int) -> list[str]:
+        """Generate questions without any API calls."""
+        title = metadata.get("title", "")
+        candidates = []
+
+        for heading in HEADING_PATTERN.findall(text):
+            heading = heading.strip().rstrip(":.")
+            candidates.append(heading if heading.endswith("?") else f"How can I improve {heading.lower()}?")
+
+        # Products were tagged at ingest against the (tenant's) catalog
+        for product in filter(None, metadata.get("products", "").split(", ")):
+            candidates.append(f"How does {product} work?")
+            candidates.append(f"What results do teams see with {product}?")
+
+        # The title fits every chunk of the article - only use it where nothing more specific exists
+        if title and (metadata.get("chunk_index") == 0 or not candidates):
+            candidates.append(title if title.endswith("?") else f"What do you know about {title.lower()}?")
+
+        questions = []
+        for candidate in candidates:
+            if candidate not in questions:
+                questions.append(candidate)
+        return questions[:count]
+
+
+def load_question_generator(spec: str, settings) -> QuestionGenerator:
+    """
+    Create the generator named by settings.question_generator.
+
+    Args:
+        spec: 'openai', 'heuristic' or 'package.module:ClassName'
+        settings: Application settings
+
+    Raises:
+        ValueError: If spec is not a known generator or import path
+    """
+    if spec == "openai":
+        return OpenAIQuestionGenerator(settings)
+    if spec == "heuristic":
+        return HeuristicQuestionGenerator(settings)
+
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown question generator '{spec}' - use 'openai', 'heuristic' or 'module:Class'")
+    return getattr(importlib.import_module(module_name), class_name)(settings)
@@ -3,40 +3,148 @@ RAG Service - Retrieval Augmented Generation
 Handles semantic search over the EliseAI blog articles using ChromaDB.
 """
 
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+import numpy as np
+from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from config import get_settings
+from services.kb_index import KnowledgeIndex, IndexWatcher, read_manifest
+from services.kb_metadata import article_filter, build_filter, combine_filters, filter_mask
+from services.tracing import get_tracer
+from services.profiling import track_upstream
+from services.single_flight import SingleFlight
+from services.admission import get_admission_controller, call_with_backoff, OverloadedError
+from openai import RateLimitError
+
+
+# Reciprocal rank fusion constant (standard value; damps the weight of top ranks)
+RRF_K = 60
 
 
 class RAGService:
     """Service for retrieving relevant content from the knowledge base."""
     
-    def __init__(self):
-        """Initialize the RAG service with ChromaDB connection."""
-        import os
+    def __init__(self, persist_directory: Optional[str] = None, product_names: Optional[list[str]] = None):
+        """
+        Initialize the RAG service with ChromaDB connection.
+        
+        Args:
+            persist_directory: Index root (defaults to settings.chroma_persist_directory)
+            product_names: Catalog the index was tagged with (defaults to PRODUCTS)
+        """
         self.settings = get_settings()
+        self.index_root = persist_directory or self.settings.chroma_persist_directory
+        self.product_names = product_names
         
         # Set API key in environment for OpenAI
         os.environ["OPENAI_API_KEY"] = self.settings.openai_api_key
         
         self.embeddings = OpenAIEmbeddings(
-            model=self.settings.embedding_model
+            model=self.settings.embedding_model,
+            dimensions=self.settings.embedding_dimensions
         )
         
-        # Load existing vector store
-        self.vectorstore = Chroma(
-            persist_directory=self.settings.chroma_persist_directory,
-            embedding_function=self.embeddings,
-            collection_name="eliseai_articles"
-        )
+        # Active index build (chunk and summary collections, optional quantized copy).
+        # Replaced wholesale on reload; each search holds a reference to the build it
+        # started with, and a replaced build is closed once those searches finish.
+        self.index = KnowledgeIndex.load(self.index_root, self.embeddings, self.settings)
+        self._reload_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._closed = False
+        
+        # Collapses identical concurrent searches into one embedding call
+        self.search_flight = SingleFlight("rag_search")
+        self.admission = get_admission_controller()
+        self.tracer = get_tracer()
+        
+        # Picks up builds published by scripts/ingest_articles.py
+        self.index_watcher = None
+        if self.settings.index_reload_interval > 0:
+            self.index_watcher = IndexWatcher(self.reload_index, self.settings.index_reload_interval)
     
-    def search(self, query: str, top_k: int = None) -> list[dict]:
+    def reload_index(self) -> bool:
+        """
+        Load the build named by the manifest and swap it in if it differs from the active one.
+        
+        The new build is opened and checked before the swap, so a failed load
+        leaves the current build serving.
+        
+        Returns:
+            True if a new build was swapped in
+        """
+        with self._reload_lock:
+            manifest = read_manifest(self.index_root)
+            if self._closed or manifest == self.index.manifest:
+                return False
+            
+            index = KnowledgeIndex.load(self.index_root, self.embeddings, self.settings)
+            with self._index_lock:
+                previous, self.index = self.index, index
+            print(f"🔄 Knowledge base index swapped: {previous.version} -> {index.version} ({self.index_root})")
+            previous.retire()
+            return True
+    
+    @contextmanager
+    def _use_index(self):
+        """Hold a reference to the active build for the duration of a search."""
+        with self._index_lock:
+            closed = self._closed
+            if not closed:
+                index = self.index
+                index.acquire()
+        if closed:
+            # Closes itself when this search releases it
+            index = KnowledgeIndex.load(self.index_root, self.embeddings, self.settings)
+            index.acquire()
+            index.retire()
+        try:
+            yield index
+        finally:
+            index.release()
+    
+    def estimate_memory(self) -> int:
+        """Rough resident size of the active index build in bytes."""
+        return self.index.estimate_memory()
+    
+    def close(self) -> None:
+        """
+        Stop watching for new builds and close the active build once in-flight searches finish.
+        
+        Requests that picked up the service before it was closed still work:
+        their searches open the current build just for themselves.
+        """
+        if self.index_watcher is not None:
+            self.index_watcher.stop()
+        with self._reload_lock:
+            with self._index_lock:
+                if self._closed:
+                    return
+                self._closed = True
+            self.index.retire()
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = None,
+        product: Optional[str] = None,
+        published_after: Optional[str] = None
+    ) -> list[dict]:
         """
         Search the knowledge base for relevant content.
         
+        Product and date restrictions are applied as metadata pre-filters, so only
+        matching chunks are scored. If nothing matches, the search is retried
+        without filters.
+        
         Args:
             query: Search query string
             top_k: Number of results to return (defaults to settings.rag_top_k)
+            product: Only chunks tagged with this product (name from the catalog)
+            published_after: Only chunks from articles dated on/after this 'YYYY-MM-DD'
         
         Returns:
             List of dicts with 'content' and 'metadata' keys
@@ -44,8 +152,12 @@ class RAGService:
         if top_k is None:
             top_k = self.settings.rag_top_k
         
-        # Perform similarity search
-        results = self.vectorstore.similarity_search(query, k=top_k)
+        where = build_filter(product, published_after, self.product_names)
+        
+        # Perform similarity search, sharing the result with identical in-flight queries
+        with self._use_index() as index, self.tracer.span("rag.search", top_k=top_k, filtered=where is not None, index_version=index.version):
+            key = f"{index.version}:{top_k}:{json.dumps(where, sort_keys=True)}:{self._normalize_query(query)}"
+            results = self.search_flight.do(key, self._similarity_search, index, query, top_k, where)
         
         # Format results
         formatted_results = []
@@ -57,6 +169,165 @@ class RAGService:
         
         return formatted_results
     
+    def _similarity_search(self, index: KnowledgeIndex, query: str, top_k: int, where: Optional[dict] = None) -> list[Document]:
+        """Embed the query once and search with the filter, falling back to an unfiltered search."""
+        with self.tracer.span("rag.embed"), track_upstream():
+            query_vector = np.asarray(self._upstream(self.embeddings.embed_query, query), dtype=np.float32)
+        
+        with self.tracer.span("rag.similarity_search", quantized=index.quantized_index is not None):
+            results = self._search_chunks(index, query_vector, top_k, where)
+            if not results and where is not None:
+                results = self._search_chunks(index, query_vector, top_k, None)
+        return results
+    
+    def _search_chunks(self, index: KnowledgeIndex, query_vector: np.ndarray, top_k: int, where: Optional[dict]) -> list[Document]:
+        """
+        Search chunks, first narrowing to the best-matching articles when hierarchical.
+        
+        The summary index has one vector per article, so the first stage stays
+        small as the blog grows; the second stage only scores those articles' chunks.
+        """
+        if index.summary_store is None:
+            return self._search_with_questions(index, query_vector, top_k, where)
+        
+        articles = index.summary_store.similarity_search_by_vector(
+            query_vector.tolist(),
+            k=self.settings.rag_article_top_k,
+            filter=where
+        )
+        article_ids = [doc.metadata["article_id"] for doc in articles if "article_id" in doc.metadata]
+        if not article_ids:
+            # Summary index missing or empty - search every chunk
+            return self._search_with_questions(index, query_vector, top_k, where)
+        
+        # Chunks merged at ingest keep one article_id but flag every article they came from
+        dedup = (index.manifest or {}).get("dedup") or {}
+        in_articles = article_filter(article_ids, merged=dedup.get("groups", 0) > 0)
+        return self._search_with_questions(index, query_vector, top_k, combine_filters(where, in_articles))
+    
+    def _search_with_questions(self, index: KnowledgeIndex, query_vector: np.ndarray, top_k: int, where: Optional[dict]) -> list[Document]:
+        """
+        Match the query against chunk text and, when indexed, synthetic questions.
+        
+        Question hits stand in for their parent chunk. The two rankings are
+        merged with reciprocal rank fusion (their distances are not comparable)
+        and deduplicated by parent, so each chunk is returned at most once.
+        """
+        chunks = self._search_by_vector(index, query_vector, top_k, where)
+        if index.question_store is None:
+            return chunks
+        
+        questions = index.question_store.similarity_search_by_vector(
+            query_vector.tolist(),
+            k=top_k * self.settings.questions_per_chunk,
+            filter=where
+        )
+        
+        docs = {doc.id: doc for doc in chunks}
+        scores = dict.fromkeys(docs, 0.0)
+        for rank, parent_id in enumerate(docs):
+            scores[parent_id] += 1.0 / (RRF_K + rank + 1)
+        
+        parent_ids = list(dict.fromkeys(doc.metadata["parent_id"] for doc in questions if "parent_id" in doc.metadata))
+        for rank, parent_id in enumerate(parent_ids):
+            scores[parent_id] = scores.get(parent_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        missing = [parent_id for parent_id in ranked if parent_id not in docs]
+        if missing:
+            records = index.vectorstore.get(ids=missing, include=["documents", "metadatas"])
+            for parent_id, text, metadata in zip(records["ids"], records["documents"], records["metadatas"]):
+                docs[parent_id] = Document(id=parent_id, page_content=text, metadata=metadata)
+        
+        return [docs[parent_id] for parent_id in ranked if parent_id in docs]
+    
+    def _search_by_vector(self, index: KnowledgeIndex, query_vector: np.ndarray, top_k: int, where: Optional[dict]) -> list[Document]:
+        """Search the quantized index when it can apply the filter, otherwise Chroma."""
+        if index.quantized_index is not None:
+            try:
+                mask = filter_mask(where, index.quantized_index.columns) if where else None
+            except KeyError:
+                # Index exported before these tags existed - let Chroma filter instead
+                mask = False
+            if mask is not False:
+                return self._quantized_search(index, query_vector, top_k, mask)
+        
+        return self._chroma_search(index.vectorstore, query_vector, top_k, where)
+    
+    @staticmethod
+    def _chroma_search(store, query_vector: np.ndarray, top_k: int, where: Optional[dict]) -> list[Document]:
+        """
+        Similarity search that keeps each chunk's Chroma id on Document.id.
+        
+        LangChain's wrapper drops the ids, so this queries the underlying collection.
+        """
+        results = store._collection.query(
+            query_embeddings=[query_vector.tolist()],
+            n_results=top_k,
+            where=where,
+            include=["documents", "metadatas"]
+        )
+        return [
+            Document(id=doc_id, page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(results["ids"][0], results["documents"][0], results["metadatas"][0])
+        ]
+    
+    def _quantized_search(self, index: KnowledgeIndex, query_vector: np.ndarray, top_k: int, mask: Optional[np.ndarray] = None) -> list[Document]:
+        """
+        Search the quantized index, optionally rescoring candidates at full precision.
+        
+        With rescoring, top_k * quantized_rescore_factor candidates are pulled from
+        the quantized index and re-ranked using the float32 embeddings in Chroma.
+        """
+        rescore = self.settings.quantized_rescore
+        num_candidates = top_k * self.settings.quantized_rescore_factor if rescore else top_k
+        candidates = index.quantized_index.search(query_vector, num_candidates, mask)
+        candidate_ids = [chunk_id for chunk_id, _ in candidates]
+        if not candidate_ids:
+            return []
+        
+        include = ["documents", "metadatas"] + (["embeddings"] if rescore else [])
+        records = index.vectorstore.get(ids=candidate_ids, include=include)
+        row_by_id = {chunk_id: i for i, chunk_id in enumerate(records["ids"])}
+        ordered = [chunk_id for chunk_id in candidate_ids if chunk_id in row_by_id]
+        
+        if rescore:
+            ordered.sort(key=lambda chunk_id: -float(
+                np.dot(np.asarray(records["embeddings"][row_by_id[chunk_id]], dtype=np.float32), query_vector)
+            ))
+        
+        return [
+            Document(
+                id=chunk_id,
+                page_content=records["documents"][row_by_id[chunk_id]],
+                metadata=records["metadatas"][row_by_id[chunk_id]]
+            )
+            for chunk_id in ordered[:top_k]
+        ]
+    
+    def _upstream(self, fn, *args, **kwargs):
+        """
+        Call an OpenAI-backed function under admission control.
+        
+        Raises:
+            OverloadedError: If no slot is available or rate limits persist after retries
+        """
+        try:
+            return call_with_backoff(
+                lambda: self.admission.call(fn, *args, **kwargs),
+                retry_on=(RateLimitError,),
+                max_retries=self.settings.upstream_max_retries,
+                base_delay=self.settings.upstream_retry_base_delay,
+                max_delay=self.settings.upstream_retry_max_delay
+            )
+        except RateLimitError as e:
+            raise OverloadedError("OpenAI rate limit persisted after retries") from e
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normalize a query so trivially different phrasings share one search."""
+        return " ".join(query.lower().split())
+    
     def format_results_for_llm(self, results: list[dict]) -> str:
         """
         Format search results into a string for LLM context.
@@ -87,6 +358,9 @@ class RAGService:
         """
         Extract source citations from search results.
         
+        A chunk merged from near-duplicates at ingest cites every article
+        it appeared in (its 'merged_sources').
+        
         Args:
             results: List of search results
         
@@ -98,18 +372,44 @@ class RAGService:
         
         for result in results:
             metadata = result['metadata']
-            title = metadata.get('title')
+            sources = json.loads(metadata['merged_sources']) if metadata.get('merged_sources') else [metadata]
             
-            # Avoid duplicate citations
-            if title and title not in seen_titles:
-                citations.append({
-                    'title': title,
-                    'author': metadata.get('author', 'Unknown'),
-                    'date': metadata.get('date', 'N/A')
-                })
-                seen_titles.add(title)
+            for source in sources:
+                title = source.get('title')
+                
+                # Avoid duplicate citations
+                if title and title not in seen_titles:
+                    citations.append({
+                        'title': title,
+                        'author': source.get('author', 'Unknown'),
+                        'date': source.get('date', 'N/A')
+                    })
+                    seen_titles.add(title)
         
         return citations
+    
+    def get_stats(self) -> dict:
+        """Get RAG service counters."""
+        index = self.index
+        stats = {
+            "coalescing": self.search_flight.get_stats(),
+            "index_version": index.version
+        }
+        if index.quantized_index is not None:
+            stats["quantized_index"] = {
+                "vectors": len(index.quantized_index.ids),
+                "dimensions": index.quantized_index.dimensions,
+                "dtype": index.quantized_index.dtype,
+                "bytes": index.quantized_index.nbytes
+            }
+        return stats
+    
+    def get_index_status(self) -> dict:
+        """Get the active build and the watcher's state."""
+        status = self.index.describe()
+        if self.index_watcher is not None:
+            status["watcher"] = self.index_watcher.get_stats()
+        return status
 
 
 # Singleton instance
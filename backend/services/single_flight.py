@@ -0,0 +1,89 @@
+"""
+Single-Flight - Request Coalescing
+Collapses identical concurrent upstream calls into one in-flight request.
+"""
+
+import threading
+
+
+class _Call:
+    """An in-flight call that followers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share the same key.
+
+    The first caller for a key (the leader) executes the function. Callers that
+    arrive with the same key while the leader is still running block until it
+    finishes and receive the same result (or exception). Nothing is cached once
+    the call completes - the next caller starts a fresh request.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the coalescer.
+
+        Args:
+            name: Label used when reporting stats
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        self._executed = 0
+        self._collapsed = 0
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless an identical call is already in flight.
+
+        Args:
+            key: Normalized identity of the call
+            fn: Callable performing the upstream request
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._collapsed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result
+
+    def get_stats(self) -> dict:
+        """Get counters for executed and collapsed calls."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "executed": self._executed,
+                "collapsed": self._collapsed,
+                "in_flight": len(self._calls)
+            }
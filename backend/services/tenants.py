@@ -0,0 +1,353 @@
+"""
+Tenants - Per-Brand Knowledge Bases, Prompts and Catalogs
+Describes each tenant served by this deployment and keeps their chat
+services in a lazily loaded, memory-bounded LRU.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import get_settings
+from prompts.product_info import PRODUCTS
+from prompts.system_prompt import COMPANY_DESCRIPTION
+from services.single_flight import SingleFlight
+
+
+class UnknownTenantError(KeyError):
+    """Raised when a request names a tenant that is not configured."""
+
+
+class Tenant:
+    """Brand, catalog and index location for one tenant."""
+
+    def __init__(
+        self,
+        tenant_id: str,
+        chroma_persist_directory: str,
+        assistant_name: str = "Alex",
+        company_name: str = "EliseAI",
+        company_description: str = COMPANY_DESCRIPTION,
+        products: dict = None,
+        calendly_demo_link: Optional[str] = None,
+        articles_directory: Optional[str] = None,
+        greeting: Optional[str] = None,
+        pitch: Optional[str] = None,
+        quick_replies: Optional[list[dict]] = None
+    ):
+        """
+        Initialize the tenant.
+
+        Args:
+            tenant_id: Identifier requests select the tenant with
+            chroma_persist_directory: Index root (versioned builds + manifest)
+            assistant_name: Name the assistant introduces itself with
+            company_name: Company the assistant sells for
+            company_description: 'About' paragraph for the system prompt
+            products: Catalog in the same shape as PRODUCTS
+            calendly_demo_link: Demo booking link
+            articles_directory: Articles ingested for this tenant
+            greeting: First message of a conversation
+            pitch: One-line overview used when answering without the LLM
+            quick_replies: Product buttons as {'label', 'value'} dicts
+        """
+        self.tenant_id = tenant_id
+        self.chroma_persist_directory = chroma_persist_directory
+        self.assistant_name = assistant_name
+        self.company_name = company_name
+        self.company_description = company_description
+        self.products = products or PRODUCTS
+        self.calendly_demo_link = calendly_demo_link
+        self.articles_directory = articles_directory
+        self.greeting = greeting or (
+            f"Hi! I'm {assistant_name}, an AI assistant with {company_name}. "
+            "What brings you here today?"
+        )
+        self.pitch = pitch or f"{company_name} offers {', '.join(self.product_names)}."
+        self.quick_replies = quick_replies or [
+            {"label": name, "value": f"Tell me about {name}"} for name in self.product_names
+        ] + [{"label": "💬 Discuss my needs", "value": "I'd like to discuss my specific challenges"}]
+
+    @property
+    def product_names(self) -> list[str]:
+        """Names of the tenant's products."""
+        return list(self.products.keys())
+
+    @classmethod
+    def default(cls, settings) -> "Tenant":
+        """The built-in EliseAI tenant served when a request names no tenant."""
+        return cls(
+            tenant_id="default",
+            chroma_persist_directory=settings.chroma_persist_directory,
+            calendly_demo_link=settings.calendly_demo_link,
+            articles_directory=settings.articles_directory,
+            greeting=(
+                "Hi! I'm Alex, an AI assistant with EliseAI. "
+                "We help property management and healthcare organizations automate operations "
+                "and improve efficiency with AI-powered solutions. "
+                "\n\nWhat brings you here today - are you in property management, healthcare, "
+                "or something else?"
+            ),
+            pitch=(
+                "EliseAI helps property management and healthcare teams automate leasing, "
+                "maintenance, collections, lease audits and resident communication."
+            ),
+            quick_replies=[
+                {"label": "🏢 LeasingAI", "value": "Tell me about LeasingAI"},
+                {"label": "🔧 MaintenanceAI", "value": "Tell me about MaintenanceAI"},
+                {"label": "💰 DelinquencyAI", "value": "Tell me about DelinquencyAI"},
+                {"label": "📋 LeaseAudits", "value": "Tell me about LeaseAudits"},
+                {"label": "📊 EliseCRM", "value": "Tell me about EliseCRM"},
+                {"label": "💬 Discuss my needs", "value": "I'd like to discuss my specific challenges"}
+            ]
+        )
+
+    @classmethod
+    def from_config(cls, tenant_id: str, config: dict, base_dir: str) -> "Tenant":
+        """
+        Build a tenant from its entry in the tenants file.
+
+        'products' may be an inline catalog or the path of a JSON file holding one;
+        relative paths are resolved against the tenants file's directory.
+
+        Raises:
+            ValueError: If chroma_persist_directory is missing
+        """
+        config = dict(config)
+        if "chroma_persist_directory" not in config:
+            raise ValueError(f"Tenant '{tenant_id}' has no chroma_persist_directory")
+
+        for key in ("chroma_persist_directory", "articles_directory"):
+            if config.get(key):
+                config[key] = os.path.join(base_dir, config[key])
+
+        if isinstance(config.get("products"), str):
+            with open(os.path.join(base_dir, config["products"]), "r", encoding="utf-8") as f:
+                config["products"] = json.load(f)
+
+        return cls(tenant_id=tenant_id, **config)
+
+
+def load_tenants(path: str) -> dict[str, Tenant]:
+    """
+    Load tenants from a JSON file of the form {"tenants": {"<id>": {...}, ...}}.
+
+    Args:
+        path: Tenants file
+
+    Returns:
+        Tenants keyed by id
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return {
+        tenant_id: Tenant.from_config(tenant_id, config, base_dir)
+        for tenant_id, config in data.get("tenants", {}).items()
+    }
+
+
+def get_tenant(tenant_id: Optional[str], settings) -> Tenant:
+    """
+    Look up one tenant's configuration (for scripts working on a single tenant's index).
+
+    Args:
+        tenant_id: Configured tenant id; None or 'default' selects the built-in tenant
+        settings: Application settings
+
+    Raises:
+        UnknownTenantError: If the tenant is not configured
+    """
+    if tenant_id is None or tenant_id == "default":
+        return Tenant.default(settings)
+    tenants = load_tenants(settings.tenants_config_path) if settings.tenants_config_path else {}
+    if tenant_id not in tenants:
+        raise UnknownTenantError(tenant_id)
+    return tenants[tenant_id]
+
+
+class TenantRegistry:
+    """
+    Chat services for configured tenants, loaded on first use.
+
+    Loaded tenants are kept in LRU order and the least recently used are
+    evicted when more than max_loaded are resident or their estimated memory
+    exceeds max_bytes. Tenants unused for idle_timeout seconds are evicted by a
+    background sweep. Evicted services are closed, not torn down mid-request:
+    requests already holding one finish on it before its index is released.
+    """
+
+    def __init__(self, tenants: dict[str, Tenant], factory, max_loaded: int, max_bytes: int, idle_timeout: float = 0):
+        """
+        Initialize the registry.
+
+        Args:
+            tenants: Configured tenants keyed by id
+            factory: Callable building a chat service for a Tenant
+            max_loaded: Maximum tenants resident at once
+            max_bytes: Estimated memory budget for resident tenants
+            idle_timeout: Seconds unused before a tenant is evicted (0 disables)
+        """
+        self.tenants = tenants
+        self.factory = factory
+        self.max_loaded = max_loaded
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._loaded: OrderedDict[str, dict] = OrderedDict()
+        # Concurrent first requests for a tenant share one load
+        self._load_flight = SingleFlight("tenant_load")
+        self._stats = {tenant_id: {"hits": 0, "loads": 0, "evictions": 0, "idle_evictions": 0} for tenant_id in tenants}
+
+        self._stop = threading.Event()
+        if idle_timeout > 0 and tenants:
+            self._sweeper = threading.Thread(target=self._sweep, name="tenant-idle-sweep", daemon=True)
+            self._sweeper.start()
+
+    def get(self, tenant_id: str):
+        """
+        Get the tenant's chat service, loading it if it is not resident.
+
+        Raises:
+            UnknownTenantError: If the tenant is not configured
+        """
+        if tenant_id not in self.tenants:
+            raise UnknownTenantError(tenant_id)
+
+        with self._lock:
+            entry = self._loaded.get(tenant_id)
+            if entry is not None:
+                self._loaded.move_to_end(tenant_id)
+                entry["last_used"] = time.time()
+                self._stats[tenant_id]["hits"] += 1
+                return entry["service"]
+
+        return self._load_flight.do(tenant_id, self._load, tenant_id)
+
+    def _load(self, tenant_id: str):
+        """Build a tenant's service, then evict others until the limits hold."""
+        started = time.monotonic()
+        service = self.factory(self.tenants[tenant_id])
+        entry = {
+            "service": service,
+            "bytes": service.rag_service.estimate_memory(),
+            "load_ms": round((time.monotonic() - started) * 1000, 1),
+            "last_used": time.time()
+        }
+
+        evicted = []
+        with self._lock:
+            self._loaded[tenant_id] = entry
+            self._stats[tenant_id]["loads"] += 1
+            while len(self._loaded) > 1 and (
+                len(self._loaded) > self.max_loaded or self._total_bytes() > self.max_bytes
+            ):
+                victim_id, victim = self._loaded.popitem(last=False)
+                self._stats[victim_id]["evictions"] += 1
+                evicted.append(victim["service"])
+
+        for victim in evicted:
+            victim.close()
+        return service
+
+    def evict_idle(self) -> list[str]:
+        """
+        Evict tenants not used for idle_timeout seconds.
+
+        Returns:
+            Ids of the evicted tenants
+        """
+        cutoff = time.time() - self.idle_timeout
+        evicted = []
+        with self._lock:
+            for tenant_id, entry in list(self._loaded.items()):
+                if entry["last_used"] < cutoff:
+                    del self._loaded[tenant_id]
+                    self._stats[tenant_id]["idle_evictions"] += 1
+                    evicted.append((tenant_id, entry["service"]))
+
+        for tenant_id, service in evicted:
+            print(f"💤 Tenant {tenant_id} unloaded after {self.idle_timeout:.0f}s idle")
+            service.close()
+        return [tenant_id for tenant_id, _ in evicted]
+
+    def _sweep(self) -> None:
+        """Idle eviction loop (checks twice per timeout)."""
+        while not self._stop.wait(self.idle_timeout / 2):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"⚠️  Tenant idle sweep failed: {type(e).__name__}: {e}")
+
+    def stop(self) -> None:
+        """Stop the idle sweep."""
+        self._stop.set()
+
+    def _total_bytes(self) -> int:
+        """Estimated memory of resident tenants (caller holds the lock)."""
+        return sum(entry["bytes"] for entry in self._loaded.values())
+
+    def get_stats(self) -> dict:
+        """Get per-tenant residency, memory and hit counters."""
+        with self._lock:
+            tenants = {}
+            for tenant_id, stats in self._stats.items():
+                entry = self._loaded.get(tenant_id)
+                tenants[tenant_id] = {
+                    **stats,
+                    "loaded": entry is not None,
+                    "estimated_bytes": entry["bytes"] if entry else 0,
+                    "load_ms": entry["load_ms"] if entry else None,
+                    "last_used": entry["last_used"] if entry else None
+                }
+            return {
+                "configured": len(self.tenants),
+                "loaded": len(self._loaded),
+                "max_loaded": self.max_loaded,
+                "estimated_bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+                "idle_timeout": self.idle_timeout,
+                "tenants": tenants
+            }
+
+
+# Singleton instance
+_tenant_registry_instance = None
+
+
+def get_tenant_registry() -> TenantRegistry:
+    """Get or create the tenant registry singleton (empty when no tenants file is configured)."""
+    global _tenant_registry_instance
+    if _tenant_registry_instance is None:
+        from services.chat_service import ChatService
+
+        settings = get_settings()
+        tenants = load_tenants(settings.tenants_config_path) if settings.tenants_config_path else {}
+        _tenant_registry_instance = TenantRegistry(
+            tenants,
+            factory=ChatService,
+            max_loaded=settings.tenant_max_loaded,
+            max_bytes=settings.tenant_max_memory_mb * 1024 * 1024,
+            idle_timeout=settings.tenant_idle_timeout
+        )
+    return _tenant_registry_instance
+
+
+def get_tenant_chat_service(tenant_id: Optional[str] = None):
+    """
+    Get the chat service for a tenant.
+
+    Args:
+        tenant_id: Configured tenant id; None or 'default' selects the built-in tenant
+
+    Raises:
+        UnknownTenantError: If the tenant is not configured
+    """
+    if tenant_id is None or tenant_id == "default":
+        from services.chat_service import get_chat_service
+        return get_chat_service()
+    return get_tenant_registry().get(tenant_id)
@@ -0,0 +1,208 @@
+"""
+Tracing - Per-Request Span Waterfalls
+Records nested timing spans for each chat turn and exports sampled traces
+asynchronously to a JSON-lines file using OTLP span field names.
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from config import get_settings
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"], sampled: bool, attributes: dict):
+        """
+        Initialize and start the span.
+
+        Args:
+            name: Operation name
+            trace_id: Trace this span belongs to
+            parent: Enclosing span, if any
+            sampled: Whether the trace is exported
+            attributes: Initial attributes
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.sampled = sampled
+        self.session_id = parent.session_id if parent else None
+        self.attributes = attributes
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value) -> None:
+        """Attach an attribute to the span."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        """Serialize with OTLP span field names."""
+        attributes = dict(self.attributes)
+        if self.session_id:
+            attributes["session_id"] = self.session_id
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": attributes
+        }
+
+
+class JsonLinesExporter:
+    """Writes finished spans to a file from a background thread."""
+
+    def __init__(self, path: str, queue_size: int):
+        """
+        Initialize the exporter and start its writer thread.
+
+        Args:
+            path: JSON-lines output file
+            queue_size: Spans buffered before new ones are dropped
+        """
+        self.path = path
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.exported = 0
+        self._writer = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._writer.start()
+
+    def export(self, span: dict) -> None:
+        """Queue a span without blocking the request."""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        """Append queued spans to the file, flushing after each burst."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._queue.get()
+                f.write(json.dumps(span) + "\n")
+                self.exported += 1
+                while not self._queue.empty():
+                    f.write(json.dumps(self._queue.get_nowait()) + "\n")
+                    self.exported += 1
+                f.flush()
+
+
+class Tracer:
+    """Creates spans and decides which traces are sampled."""
+
+    def __init__(self, enabled: bool, sample_rate: float, exporter: Optional[JsonLinesExporter]):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: If False, span() is a no-op
+            sample_rate: Fraction of traces (0-1) that are exported
+            exporter: Destination for finished spans
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Time a block as a child of the current span (or as a new trace's root).
+
+        The sampling decision is made once per trace at the root and inherited
+        by every child, so traces are exported whole or not at all.
+
+        Yields:
+            The Span, or None when tracing is disabled
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        if parent is None:
+            span = Span(name, secrets.token_hex(16), None, random.random() < self.sample_rate, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent, parent.sampled, attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "ERROR"
+            span.set_attribute("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if span.sampled:
+                self.exporter.export(span.to_dict())
+
+    def record(self, name: str, start_ns: int, **attributes) -> None:
+        """Record an already-finished child span that started at start_ns and ends now."""
+        parent = _current_span.get()
+        if not self.enabled or parent is None or not parent.sampled:
+            return
+        span = Span(name, parent.trace_id, parent, True, attributes)
+        span.start_ns = start_ns
+        span.end_ns = time.time_ns()
+        self.exporter.export(span.to_dict())
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """Get the active span, if any."""
+        return _current_span.get()
+
+    def set_session(self, session_id: Optional[str]) -> None:
+        """Correlate the current span, and spans started under it, with a session."""
+        span = _current_span.get()
+        if span is not None and session_id:
+            span.session_id = session_id
+
+    def get_stats(self) -> dict:
+        """Get exporter counters."""
+        if self.exporter is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "sample_rate": self.sample_rate,
+            "exported": self.exporter.exported,
+            "dropped": self.exporter.dropped
+        }
+
+
+# Singleton instance
+_tracer_instance = None
+
+
+def get_tracer() -> Tracer:
+    """Get or create tracer singleton."""
+    global _tracer_instance
+    if _tracer_instance is None:
+        settings = get_settings()
+        exporter = None
+        if settings.tracing_enabled:
+            exporter = JsonLinesExporter(settings.tracing_export_path, settings.tracing_queue_size)
+        _tracer_instance = Tracer(settings.tracing_enabled, settings.tracing_sample_rate, exporter)
+    return _tracer_instance
@@ -4,12 +4,17 @@ Defines the tools available to the AI SDR.
 """
 
 from config import get_settings
+from prompts.product_info import get_product_names
 
 
-def get_tool_definitions() -> list[dict]:
+def get_tool_definitions(company_name: str = "EliseAI", product_names: list[str] = None) -> list[dict]:
     """
     Get the list of tool definitions for OpenAI function calling.
     
+    Args:
+        company_name: Company whose blog the knowledge base holds
+        product_names: Catalog for the product filter (defaults to PRODUCTS)
+    
     Returns:
         List of tool definition dicts in OpenAI format
     """
@@ -20,7 +25,7 @@ def get_tool_definitions() -> list[dict]:
             "function": {
                 "name": "search_knowledge_base",
                 "description": (
-                    "Search EliseAI's blog articles for detailed information about products, "
+                    f"Search {company_name}'s blog articles for detailed information about products, "
                     "features, case studies, pricing, implementation details, or industry insights. "
                     "Use this when you need specific facts, examples, statistics, or detailed explanations "
                     "beyond your basic product knowledge. Do NOT use for basic greetings, qualification "
@@ -36,6 +41,18 @@ def get_tool_definitions() -> list[dict]:
                                 "Examples: 'LeasingAI features and benefits', 'case studies for property management', "
                                 "'DelinquencyAI pricing and ROI', 'MaintenanceAI implementation process'"
                             )
+                        },
+                        "product": {
+                            "type": "string",
+                            "enum": product_names or get_product_names(),
+                            "description": (
+                                "Restrict the search to articles about this product. "
+                                "Only set this when the conversation is clearly about one product."
+                            )
+                        },
+                        "published_after": {
+                            "type": "string",
+                            "description": "Only search articles published on or after this date (YYYY-MM-DD), e.g. for recent news"
                         }
                     },
                     "required": ["query"]
@@ -70,18 +87,25 @@ def get_tool_definitions() -> list[dict]:
     return tools
 
 
-def execute_search_knowledge_base(query: str, rag_service) -> dict:
+def execute_search_knowledge_base(
+    query: str,
+    rag_service,
+    product: str = None,
+    published_after: str = None
+) -> dict:
     """
     Execute the search_knowledge_base tool.
     
     Args:
         query: Search query string
         rag_service: RAGService instance
+        product: Optional product to restrict the search to
+        published_after: Optional earliest article date (YYYY-MM-DD)
     
     Returns:
         Dict with search results and formatted content
     """
-    results = rag_service.search(query)
+    results = rag_service.search(query, product=product, published_after=published_after)
     formatted_content = rag_service.format_results_for_llm(results)
     citations = rag_service.get_source_citations(results)
     
@@ -92,12 +116,13 @@ def execute_search_knowledge_base(query: str, rag_service) -> dict:
     }
 
 
-def execute_book_demo(reason: str = None) -> dict:
+def execute_book_demo(reason: str = None, calendly_url: str = None) -> dict:
     """
     Execute the book_demo tool.
     
     Args:
         reason: Brief note on why they want a demo (optional)
+        calendly_url: Booking link (defaults to settings.calendly_demo_link)
     
     Returns:
         Dict with calendly link and confirmation message
@@ -105,7 +130,7 @@ def execute_book_demo(reason: str = None) -> dict:
     settings = get_settings()
     
     return {
-        "calendly_url": settings.calendly_demo_link,
+        "calendly_url": calendly_url or settings.calendly_demo_link,
         "message": (
             "Perfect! I've prepared your demo booking link below. "
             "Click it to choose a time that works best for you. "
@@ -113,3 +138,45 @@ def execute_book_demo(reason: str = None) -> dict:
         )
     }
 
+
+def render_book_demo_reply(tool_result: dict, partial_text: str = None) -> str:
+    """
+    Render the final reply for book_demo without another completion.
+    
+    Args:
+        tool_result: Result from execute_book_demo()
+        partial_text: Any text the model wrote alongside the tool call
+    
+    Returns:
+        Reply text
+    """
+    if partial_text and partial_text.strip():
+        return f"{partial_text.strip()}\n\n{tool_result['message']}"
+    return tool_result["message"]
+
+
+# Tools whose result fully determines the reply. LLMService renders these
+# directly instead of making a second completion to phrase the result.
+TERMINAL_TOOLS = {
+    "book_demo": render_book_demo_reply
+}
+
+
+def is_terminal_tool(name: str) -> bool:
+    """Check whether a tool's reply can be rendered without a second completion."""
+    return name in TERMINAL_TOOLS
+
+
+def render_terminal_response(name: str, tool_result: dict, partial_text: str = None) -> str:
+    """
+    Render the reply for a terminal tool.
+    
+    Args:
+        name: Tool name (must be in TERMINAL_TOOLS)
+        tool_result: Result returned by the tool
+        partial_text: Any text the model wrote alongside the tool call
+    
+    Returns:
+        Reply text
+    """
+    return TERMINAL_TOOLS[name](tool_result, partial_text)
@@ -25,6 +25,7 @@ export interface ChatResponse {
   sources?: Source[];
   tool_used?: string;
   calendly_url?: string;
+  degraded?: boolean;
 }
 
 export interface InitChatResponse {